@@ -1,9 +1,14 @@
+from dataclasses import dataclass
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
+from app.core.cache import MISSING, TTLCache
 from app.models.user import User
-from app.database.session import get_db
+from app.database.session import DB_ASYNC, get_async_db, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 import os
@@ -14,12 +19,31 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "YOUR_SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
+# 認証済みユーザーのキャッシュ（トークン文字列 -> CurrentUser）。0 で無効。
+# トークンに exp があればそれより長くは保持しない。
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+_user_cache = TTLCache(AUTH_CACHE_TTL, AUTH_CACHE_MAXSIZE)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """認証済みユーザーの軽量な表現。DBセッションに紐づかないのでキャッシュで共有できる。
+    ユーザー自身を更新したい場合は id で User を取得し直すこと。"""
+    id: int
+    username: str
+    icon: int
+
+
+def invalidate_user(user_id: int) -> None:
+    """ユーザー情報を変更したら呼ぶ。そのユーザーのキャッシュ済みトークンをすべて破棄する。"""
+    _user_cache.discard_where(lambda _, principal: principal.id == user_id)
+
+
+def _load_current_user(db: Session, token: str) -> CurrentUser:
     # ① トークンからユーザーIDを取り出す
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -37,4 +61,37 @@ def get_current_user(
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    principal = CurrentUser(id=user.id, username=user.username, icon=user.icon)
+    exp = payload.get("exp")
+    _user_cache.set(token, principal, ttl=exp - time.time() if exp is not None else None)
+    return principal
+
+
+def authenticate_token(db: Session, token: str) -> CurrentUser:
+    """トークンを検証してユーザーを返す（無効なら 401）。Depends を使えない WebSocket などから呼ぶ。"""
+    # ⓪ 検証済みトークンならDBに問い合わせずに返す
+    cached = _user_cache.get(token)
+    if cached is not MISSING:
+        return cached
+    return _load_current_user(db, token)
+
+
+def _get_current_user_sync(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    return authenticate_token(db, token)
+
+
+async def _get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    cached = _user_cache.get(token)
+    if cached is not MISSING:
+        return cached
+    return await db.run_sync(_load_current_user, token)
+
+
+# DB_ASYNC に合わせて、エンドポイントと同じセッションを共有する方を使う
+get_current_user = _get_current_user_async if DB_ASYNC else _get_current_user_sync
@@ -0,0 +1,109 @@
+import logging
+
+from sqlalchemy import event, inspect
+
+from app.database.session import Base
+
+# 差分同期（GET /tasks/projects/{id}/changes）用の変更ログをトリガーで記録する。
+# tasks の INSERT/UPDATE/DELETE のたびに、同じ文の中で
+#   1. projects.change_seq を +1 する（行ロックで同じプロジェクトへの書き込みが直列化される）
+#   2. task_changes に (task_id, project_id, seq, deleted) を upsert する
+# 通番は行ロック下で採番されるので、コミット順と通番順が一致し、時計のずれにも影響されない。
+# ORM を通らない一括 UPDATE/DELETE やカスケード削除でも記録される。
+
+logger = logging.getLogger(__name__)
+
+# レスポンスに現れる列。path/depth だけの更新（サブツリーの移動）は記録しない。
+# AFTER UPDATE OF は値が変わらなくても SET に含まれれば発火するので、updated_at は入れない
+# （移動時の子孫の UPDATE は updated_at = updated_at を含む）。内容の変わる更新は他の列も必ず SET に含む。
+_TRACKED_COLUMNS = "title, description, deadline, parent_id, status, priority, assignee_id, updated_by"
+
+
+def _sqlite_log(row: str, deleted: int) -> str:
+    return (
+        f"UPDATE projects SET change_seq = change_seq + 1 WHERE id = {row}.project_id; "
+        "INSERT INTO task_changes (task_id, project_id, seq, deleted) "
+        f"SELECT {row}.id, {row}.project_id, change_seq, {deleted} FROM projects WHERE id = {row}.project_id "
+        "ON CONFLICT (task_id) DO UPDATE SET "
+        "project_id = excluded.project_id, seq = excluded.seq, deleted = excluded.deleted; "
+    )
+
+
+_SQLITE_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS task_changes_ai AFTER INSERT ON tasks BEGIN "
+    + _sqlite_log("new", 0) + "END",
+    f"CREATE TRIGGER IF NOT EXISTS task_changes_au AFTER UPDATE OF {_TRACKED_COLUMNS} ON tasks BEGIN "
+    + _sqlite_log("new", 0) + "END",
+    "CREATE TRIGGER IF NOT EXISTS task_changes_ad AFTER DELETE ON tasks BEGIN "
+    + _sqlite_log("old", 1) + "END",
+    # 外部キーの ON DELETE CASCADE が効かない接続（PRAGMA foreign_keys=OFF）でも、プロジェクト削除時に掃除する
+    "CREATE TRIGGER IF NOT EXISTS task_changes_project_ad AFTER DELETE ON projects BEGIN "
+    "DELETE FROM task_changes WHERE project_id = old.id; END",
+]
+_SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS task_changes_project_ad",
+    "DROP TRIGGER IF EXISTS task_changes_ad",
+    "DROP TRIGGER IF EXISTS task_changes_au",
+    "DROP TRIGGER IF EXISTS task_changes_ai",
+]
+
+_PG_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION log_task_change() RETURNS trigger AS $$
+    DECLARE
+        row_id integer;
+        row_project integer;
+        next_seq integer;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_id := OLD.id;
+            row_project := OLD.project_id;
+        ELSE
+            row_id := NEW.id;
+            row_project := NEW.project_id;
+        END IF;
+        UPDATE projects SET change_seq = change_seq + 1 WHERE id = row_project
+            RETURNING change_seq INTO next_seq;
+        IF next_seq IS NOT NULL THEN
+            INSERT INTO task_changes (task_id, project_id, seq, deleted)
+            VALUES (row_id, row_project, next_seq, TG_OP = 'DELETE')
+            ON CONFLICT (task_id) DO UPDATE SET
+                project_id = EXCLUDED.project_id, seq = EXCLUDED.seq, deleted = EXCLUDED.deleted;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS task_changes_log ON tasks",
+    f"CREATE TRIGGER task_changes_log AFTER INSERT OR UPDATE OF {_TRACKED_COLUMNS} OR DELETE ON tasks "
+    "FOR EACH ROW EXECUTE FUNCTION log_task_change()",
+]
+_PG_DROP = [
+    "DROP TRIGGER IF EXISTS task_changes_log ON tasks",
+    "DROP FUNCTION IF EXISTS log_task_change()",
+]
+
+
+def install_change_log(conn) -> None:
+    """変更ログのトリガーを作る（作成済みなら何もしない）。
+    テーブル作成時とマイグレーションから呼ぶ。projects.change_seq がない（未マイグレーションの）DB では作らない。"""
+    columns = {c["name"] for c in inspect(conn).get_columns("projects")}
+    if "change_seq" not in columns:
+        logger.warning("projects.change_seq がないため変更ログを記録しません。マイグレーションを実行してください")
+        return
+    dialect = conn.dialect.name
+    for ddl in _SQLITE_DDL if dialect == "sqlite" else _PG_DDL if dialect == "postgresql" else []:
+        conn.exec_driver_sql(ddl)
+
+
+def drop_change_log(conn) -> None:
+    dialect = conn.dialect.name
+    for ddl in _SQLITE_DROP if dialect == "sqlite" else _PG_DROP if dialect == "postgresql" else []:
+        conn.exec_driver_sql(ddl)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_change_log(target, connection, tables=None, **kw):
+    # projects / tasks / task_changes がすべて揃ってから作る
+    if {"projects", "tasks", "task_changes"} <= set(target.tables):
+        install_change_log(connection)
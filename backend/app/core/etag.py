@@ -0,0 +1,56 @@
+import hashlib
+from datetime import datetime
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response
+
+# ETag / 条件付きリクエスト（If-None-Match, If-Match）の共通処理。
+# ETag は行を読み込まずに求められる「変更の目印」（更新日時・件数など）から作る強い ETag。
+# 目印の値が同じなら同じ表現を返すことが前提なので、レスポンスに影響する値はすべて parts に含めること。
+
+# ブラウザ等に保存はさせてよいが、使う前に必ず再検証させる
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    def normalize(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    digest = hashlib.sha1(repr(tuple(normalize(p) for p in parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _header_etags(value: str) -> list[str]:
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match が etag に一致するか（GET 用。弱い比較なので W/ 付きも一致とみなす）。"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = _header_etags(header)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def check_if_match(request: Request, etag: str | Callable[[], str]) -> None:
+    """If-Match があり、現在の etag と一致しなければ 412（他の人の更新を上書きしないため）。
+    ヘッダーがなければ従来どおり無条件で更新する。強い比較なので W/ 付きは一致しない。
+    etag の計算にクエリが要る場合は関数で渡すと、ヘッダーがあるときだけ計算する。"""
+    header = request.headers.get("if-match")
+    if not header:
+        return
+    if callable(etag):
+        etag = etag()
+    tags = _header_etags(header)
+    if "*" not in tags and etag not in tags:
+        raise HTTPException(status_code=412, detail="他のユーザーが先に更新しています。最新の内容を取得してください")
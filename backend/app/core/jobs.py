@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database.session import SessionLocal
+from app.models.job import Job
+from app.schemas.job import JobRead
+
+load_dotenv()
+
+# プロセス内のバックグラウンドジョブ。外部のブローカーは使わず、jobs テーブルをキューにする。
+# - ルーターは enqueue() でジョブを登録して 202 を返し、クライアントは GET /jobs/{id} で進捗を確認する。
+# - ワーカーはスレッドで、jobs テーブルから実行可能なジョブを UPDATE ... RETURNING で1件ずつ確保する
+#   （複数プロセスでも同じジョブを二重に確保しない）。
+# - 処理は job_handler で登録した同期関数。ctx.db で DB を操作し、区切りごとにコミットして ctx.progress() を呼ぶ。
+# - 例外で失敗したジョブはバックオフを挟んで max_attempts 回まで再試行する（JobError は再試行しない）。
+#   再試行や引き継ぎで同じジョブが再実行されてもよいよう、ハンドラーは冪等に書くこと。
+# - heartbeat_at が JOB_LEASE_SECONDS 以上更新されない実行中のジョブ（プロセスが落ちた等）は別のワーカーが引き継ぐ。
+
+# ワーカースレッド数。0 にするとこのプロセスではジョブを実行しない（登録だけする）。
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 新しいジョブがないときに jobs テーブルを見に行く間隔（秒）。同じプロセスで登録されたジョブはすぐ起こす。
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# 再試行までの待ち時間（秒）。試行ごとに倍にする。
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+# この秒数 heartbeat がない実行中のジョブは止まったものとみなす
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+JST = ZoneInfo("Asia/Tokyo")
+logger = logging.getLogger(__name__)
+
+_handlers: dict[str, Callable] = {}
+
+
+class JobCancelled(Exception):
+    """キャンセル要求があったとき ctx.progress() が投げる。ハンドラーで握りつぶさないこと。"""
+
+
+class JobError(Exception):
+    """再試行しても結果が変わらない失敗（対象が見つからない等）。メッセージがそのまま error に入る。"""
+
+
+def job_handler(kind: str):
+    """ジョブの処理を登録するデコレーター。関数は JobContext を受け取り、JSON にできる結果を返す。"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def _now() -> datetime:
+    # DateTime 列はタイムゾーンなし（JST）で保存されている
+    return datetime.now(JST).replace(tzinfo=None)
+
+
+class JobContext:
+    def __init__(self, job: Job, db: Session):
+        self.job_id = job.id
+        self.params = json.loads(job.params)
+        self.user_id = job.created_by
+        self.project_id = job.project_id
+        self.attempt = job.attempts
+        # ハンドラー用のセッション。進捗の記録は別のセッションで行う。
+        self.db = db
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        """進捗を記録し、heartbeat を更新する。キャンセル要求があれば JobCancelled を投げる。
+        SQLite では書き込みが直列化されるので、ctx.db の変更をコミットしてから呼ぶこと。"""
+        values = {"progress_done": done, "heartbeat_at": _now()}
+        if total is not None:
+            values["progress_total"] = total
+        with SessionLocal() as db:
+            cancel_requested = db.execute(
+                update(Job).where(Job.id == self.job_id).values(**values).returning(Job.cancel_requested),
+                execution_options={"synchronize_session": False},
+            ).scalar()
+            db.commit()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    user_id: int,
+    params: dict | None = None,
+    project_id: int | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    """ジョブを登録してコミットし、ワーカーを起こす。権限チェックは呼び出し側で済ませておくこと。"""
+    if kind not in _handlers:
+        raise ValueError(f"unknown job kind: {kind}")
+    job = Job(
+        kind=kind,
+        status=STATUS_QUEUED,
+        params=json.dumps(jsonable_encoder(params or {}), ensure_ascii=False),
+        project_id=project_id,
+        created_by=user_id,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+        run_after=_now(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    runner.wake()
+    return job
+
+
+def request_cancel(db: Session, job: Job) -> None:
+    """待機中ならすぐ取り消し、実行中ならハンドラーが次に progress() を呼んだ時点で止める。"""
+    if job.status == STATUS_QUEUED:
+        job.status = STATUS_CANCELLED
+        job.finished_at = _now()
+    elif job.status == STATUS_RUNNING:
+        job.cancel_requested = True
+    db.commit()
+    db.refresh(job)
+
+
+def requeue(db: Session, job: Job) -> None:
+    """失敗・取り消したジョブを最初からやり直す。"""
+    job.status = STATUS_QUEUED
+    job.attempts = 0
+    job.cancel_requested = False
+    job.error = None
+    job.result = None
+    job.progress_done = 0
+    job.progress_total = None
+    job.run_after = _now()
+    job.started_at = None
+    job.finished_at = None
+    db.commit()
+    db.refresh(job)
+    runner.wake()
+
+
+def job_to_read(job: Job) -> JobRead:
+    result = JobRead.model_validate(job, from_attributes=True)
+    result.params = json.loads(job.params) if job.params else {}
+    result.result = json.loads(job.result) if job.result is not None else None
+    return result
+
+
+def job_accepted(job: Job) -> JSONResponse:
+    """ジョブを受け付けたレスポンス（202 Accepted、Location に状態確認の URL）。"""
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(job_to_read(job)),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+def claim_next_job(db: Session) -> int | None:
+    """実行できるジョブを1件 running にして id を返す（なければ None。コミットは呼び出し側）。"""
+    now = _now()
+    claimable = or_(
+        and_(Job.status == STATUS_QUEUED, Job.run_after <= now),
+        and_(Job.status == STATUS_RUNNING, Job.heartbeat_at < now - timedelta(seconds=JOB_LEASE_SECONDS)),
+    )
+    next_id = select(Job.id).where(claimable).order_by(Job.id).limit(1).scalar_subquery()
+    # 条件を UPDATE の WHERE でも確かめるので、同じジョブを確保できるのは1つのワーカーだけ
+    return db.execute(
+        update(Job)
+        .where(Job.id == next_id, claimable)
+        .values(status=STATUS_RUNNING, attempts=Job.attempts + 1, started_at=now, heartbeat_at=now)
+        .returning(Job.id),
+        execution_options={"synchronize_session": False},
+    ).scalar()
+
+
+class JobRunner:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._threads: list[threading.Thread] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        """実行中のジョブは最後まで待つ（timeout を過ぎたら待たずに戻り、heartbeat 切れで引き継がれる）。"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stop.set()
+        self._wake.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def wake(self) -> None:
+        self.start()
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job_id = self._claim()
+            except Exception:
+                logger.exception("ジョブの取得に失敗しました")
+                job_id = None
+            if job_id is None:
+                self._wake.wait(JOB_POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            self._run(job_id)
+
+    def _claim(self) -> int | None:
+        with SessionLocal() as db:
+            job_id = claim_next_job(db)
+            db.commit()
+        return job_id
+
+    def _run(self, job_id: int) -> None:
+        with SessionLocal() as db:
+            job = db.get(Job, job_id)
+            kind, attempts, max_attempts = job.kind, job.attempts, job.max_attempts
+            handler = _handlers.get(kind)
+            ctx = JobContext(job, db)
+            try:
+                if job.cancel_requested:
+                    raise JobCancelled()
+                if handler is None:
+                    raise JobError(f"未知のジョブです: {kind}")
+                if attempts > max_attempts:
+                    raise JobError("再試行の上限に達しました")
+                result = handler(ctx)
+                db.commit()
+            except JobCancelled:
+                db.rollback()
+                self._finish(job_id, status=STATUS_CANCELLED)
+            except JobError as exc:
+                db.rollback()
+                self._finish(job_id, status=STATUS_FAILED, error=str(exc))
+            except Exception as exc:
+                db.rollback()
+                logger.exception("ジョブ %s（%s）が失敗しました", job_id, kind)
+                error = f"{type(exc).__name__}: {exc}"
+                if attempts < max_attempts:
+                    delay = JOB_RETRY_BACKOFF * (2 ** (attempts - 1))
+                    self._finish(
+                        job_id,
+                        status=STATUS_QUEUED,
+                        error=error,
+                        run_after=_now() + timedelta(seconds=delay),
+                        finished_at=None,
+                    )
+                else:
+                    self._finish(job_id, status=STATUS_FAILED, error=error)
+            else:
+                self._finish(
+                    job_id,
+                    status=STATUS_SUCCEEDED,
+                    result=json.dumps(jsonable_encoder(result), ensure_ascii=False),
+                    error=None,
+                )
+
+    def _finish(self, job_id: int, **values) -> None:
+        values.setdefault("finished_at", _now())
+        with SessionLocal() as db:
+            db.execute(
+                update(Job).where(Job.id == job_id).values(heartbeat_at=None, **values),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+
+
+runner = JobRunner(JOB_WORKERS)
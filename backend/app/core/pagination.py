@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, select, tuple_
+
+# キーセット（カーソル）ページネーションの共通処理。
+# カーソルは並び順のキー列（例: updated_at, id）の値を JSON にして base64url にしたもの。
+# クライアントからは中身を解釈しない不透明な文字列として扱ってもらう。
+
+# 件数を数えるときの上限。これを超えるプロジェクトでは total を打ち切り、total_is_exact=False にする。
+COUNT_LIMIT = 10000
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    """encode_cursor の逆。形式が不正なら 400。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return tuple(_decode_value(v) for v in values)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="cursor が不正です")
+
+
+def keyset_after(columns: tuple, values: tuple, descending: bool = True):
+    """(columns) が values より後ろ（並び順で次のページ側）にある行の条件。
+    行値比較 (a, b) < (x, y) はインデックスの範囲検索になる。"""
+    bound = tuple_(*values, types=[c.type for c in columns])
+    if descending:
+        return tuple_(*columns) < bound
+    return tuple_(*columns) > bound
+
+
+def paginate(query, columns: tuple, limit: int, cursor: str | None, descending: bool = True):
+    """query（絞り込み済み・並び順未指定）をキーセットで1ページ分取得する。
+    limit + 1 件取って次ページの有無を判定し、(items, next_cursor) を返す。"""
+    if cursor is not None:
+        query = query.filter(keyset_after(columns, decode_cursor(cursor, len(columns)), descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(getattr(last, c.key) for c in columns))
+    return rows, next_cursor
+
+
+def count_capped(db, query, limit: int | None = None) -> tuple[int, bool]:
+    """query の件数を数える。limit（省略時 COUNT_LIMIT）件を超える分は数えずに打ち切る
+    （大きなプロジェクトでの全件 COUNT を避ける）。戻り値は (件数, 正確かどうか)。"""
+    if limit is None:
+        limit = COUNT_LIMIT
+    capped = query.order_by(None).with_entities(literal_column("1")).limit(limit + 1).subquery()
+    total = db.execute(select(func.count()).select_from(capped)).scalar_one()
+    if total > limit:
+        return limit, False
+    return total, True
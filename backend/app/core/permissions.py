@@ -1,38 +1,131 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import or_, select, true
 from sqlalchemy.orm import Session
+from app.core.cache import MISSING, TTLCache
 from app.models.project_member import ProjectMember
 from app.models.task import Task
-from app.models.user import User
+from app.core.auth import CurrentUser
+
+load_dotenv()
 
-# NOTE: 簡易版の権限チェック。後でキャッシュや複雑なロールに拡張予定。
+# NOTE: 簡易版の権限チェック。後で複雑なロールに拡張予定。
 
 ROLE_ADMIN = "ADMIN"
 ROLE_VIEWER = "VIEWER"
 
+# ロールキャッシュ設定
+# - リクエスト単位のメモ化は常に有効（Session.info に保持）
+# - プロセス共有の TTL/LRU キャッシュは PERMISSION_CACHE_TTL > 0 のときのみ有効。
+#   複数ワーカー構成ではワーカー間で無効化が伝播しないため、TTL は短めにすること。
+PERMISSION_CACHE_TTL = float(os.getenv("PERMISSION_CACHE_TTL", "0"))
+PERMISSION_CACHE_MAXSIZE = int(os.getenv("PERMISSION_CACHE_MAXSIZE", "10000"))
+
+_REQUEST_CACHE_KEY = "project_role_cache"
+
+_role_cache = TTLCache(PERMISSION_CACHE_TTL, PERMISSION_CACHE_MAXSIZE)
+
+
+def _request_cache(db: Session) -> dict:
+    # Session は get_db でリクエストごとに作られるため、info をリクエストスコープの置き場に使う
+    return db.info.setdefault(_REQUEST_CACHE_KEY, {})
+
 
 def user_project_role(db: Session, user_id: int, project_id: int | None) -> str | None:
     """ユーザーのプロジェクト内ロールを返す。未参加なら None。
+    同一リクエスト内ではメモ化され、設定によりプロセス共有キャッシュも参照する。
     将来はプロジェクト非所属でも自分のタスクなら許可する等の分岐を追加予定。
     """
     if project_id is None:
         return None
-    member = (
-        db.query(ProjectMember)
-        .filter(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id)
-        .first()
+    key = (project_id, user_id)
+    local = _request_cache(db)
+    role = local.get(key, MISSING)
+    if role is not MISSING:
+        return role
+
+    role = _role_cache.get(key)
+    if role is MISSING:
+        member = (
+            db.query(ProjectMember)
+            .filter(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id)
+            .first()
+        )
+        role = member.role if member else None
+        _role_cache.set(key, role)
+
+    local[key] = role
+    return role
+
+
+def prime_project_roles(db: Session, user_id: int, project_ids) -> None:
+    """複数プロジェクトのロールを1クエリで読み込み、リクエスト内キャッシュに載せる。
+    一括処理で user_project_role / can_* をタスクごとに呼ぶ前に使う。"""
+    local = _request_cache(db)
+    missing = {pid for pid in project_ids if pid is not None and (pid, user_id) not in local}
+    if not missing:
+        return
+    roles = dict(
+        db.query(ProjectMember.project_id, ProjectMember.role)
+        .filter(ProjectMember.user_id == user_id, ProjectMember.project_id.in_(missing))
+        .all()
+    )
+    for project_id in missing:
+        role = roles.get(project_id)
+        local[(project_id, user_id)] = role
+        _role_cache.set((project_id, user_id), role)
+
+
+def invalidate_project_roles(db: Session | None, project_id: int, user_id: int | None = None) -> None:
+    """メンバー招待・ロール変更・削除・プロジェクト削除の後に呼ぶ。
+    user_id を省略するとプロジェクト全体のキャッシュを破棄する。"""
+    if user_id is not None:
+        _role_cache.pop((project_id, user_id))
+    else:
+        _role_cache.discard_where(lambda key, _: key[0] == project_id)
+    if db is None:
+        return
+    local = _request_cache(db)
+    if user_id is not None:
+        local.pop((project_id, user_id), None)
+        return
+    for key in [k for k in local if k[0] == project_id]:
+        del local[key]
+
+
+def visible_tasks_clause(user_id: int, project_role=MISSING):
+    """can_view_task と同じ条件を SQL の WHERE 句として返す。
+    一覧系でPython側の後フィルタをやめ、LIMIT/OFFSET をDB側で正しく効かせるために使う。
+    単一プロジェクトの一覧でロールが既知なら project_role に渡すと EXISTS を省略する。
+    """
+    if project_role is not MISSING:
+        if project_role in (ROLE_ADMIN, ROLE_VIEWER):
+            return true()
+        return or_(Task.created_by == user_id, Task.assignee_id == user_id)
+    member_exists = (
+        select(ProjectMember.id)
+        .where(
+            ProjectMember.project_id == Task.project_id,
+            ProjectMember.user_id == user_id,
+            ProjectMember.role.in_((ROLE_ADMIN, ROLE_VIEWER)),
+        )
+        .exists()
     )
-    return member.role if member else None
+    return or_(Task.created_by == user_id, Task.assignee_id == user_id, member_exists)
 
 
-def can_view_task(db: Session, user: User, task: Task) -> bool:
+def can_view_task(db: Session, user: CurrentUser, task: Task) -> bool:
     """閲覧許可: 作成者 or 担当者 or プロジェクトADMIN。
-    VIEWERも閲覧可にする場合はここで許可。"""
+    VIEWERも閲覧可にする場合はここで許可。
+    条件を変えるときは visible_tasks_clause も合わせて変更すること。"""
     if task.created_by == user.id or task.assignee_id == user.id:
         return True
     role = user_project_role(db, user.id, task.project_id)
     return role == ROLE_ADMIN or role == ROLE_VIEWER
 
 
-def can_modify_task(db: Session, user: User, task: Task) -> bool:
+def can_modify_task(db: Session, user: CurrentUser, task: Task) -> bool:
     """変更許可（ステータス変更以外の操作）:
     - プロジェクトタスク: メンバーかつ（作成者 or ADMIN or 担当者）。
       要件: VIEWERはステータス変更のみ許可。編集は不可。
@@ -43,7 +136,7 @@ def can_modify_task(db: Session, user: User, task: Task) -> bool:
     role = user_project_role(db, user.id, task.project_id)
     return task.created_by == user.id or role == ROLE_ADMIN or task.assignee_id == user.id
 
-def can_change_status(db: Session, user: User, task: Task) -> bool:
+def can_change_status(db: Session, user: CurrentUser, task: Task) -> bool:
     """ステータス変更許可:
     - プロジェクトタスク: メンバーかつ（ADMIN or VIEWER or 作成者 or 担当者）。
       要件: VIEWERはステータス変更のみ可。
@@ -0,0 +1,179 @@
+import os
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.core.jobs import JobContext, JobError, job_handler
+from app.core.permissions import invalidate_project_roles
+from app.core.realtime import hub
+from app.models.project import Project
+from app.models.project_member import ProjectMember
+from app.models.task import Task
+from app.models.task_history import TaskHistory
+from app.models.user import User
+from app.schemas.project import ProjectMemberRead
+from app.schemas.task import TaskRead
+
+# プロジェクト単位の重い処理（バックグラウンドジョブ）。
+# 一定件数ごとにコミットするので、SQLite でも書き込みロックを長く握り続けない。
+# 再試行・引き継ぎで途中から再実行されても結果が変わらないように書いている。
+
+# 1回のコミットで処理するタスク数
+PROJECT_JOB_CHUNK = int(os.getenv("PROJECT_JOB_CHUNK", "1000"))
+
+
+def reassign_tasks(
+    db: Session,
+    project_id: int,
+    from_user_id: int,
+    to_user_id: int,
+    acting_user_id: int,
+    limit: int | None = None,
+) -> list[int]:
+    """from_user_id が担当のタスク（limit 件まで）を to_user_id に付け替え、付け替えた id を返す（コミットは呼び出し側）。
+    タスクを読み込まずに、担当者変更の履歴の INSERT ... SELECT と UPDATE の2文で行う。"""
+    target = (Task.project_id == project_id, Task.assignee_id == from_user_id)
+    if limit is not None:
+        chunk = select(Task.id).where(*target).order_by(Task.id).limit(limit)
+        target = (Task.id.in_(chunk),)
+    # 履歴を先に書く（UPDATE の後では付け替え前の担当者で絞り込めない）
+    db.execute(
+        insert(TaskHistory).from_select(
+            ["task_id", "user_id", "action_type", "changes"],
+            select(
+                Task.id,
+                literal(acting_user_id),
+                literal("ASSIGNEE_CHANGE"),
+                literal(f"{from_user_id} -> {to_user_id}"),
+            ).where(*target),
+        )
+    )
+    # updated_at はモデルの onupdate で付与される
+    return list(
+        db.scalars(
+            update(Task)
+            .where(*target)
+            .values(assignee_id=to_user_id, updated_by=acting_user_id)
+            .returning(Task.id),
+            execution_options={"synchronize_session": False},
+        )
+    )
+
+
+@job_handler("project.delete")
+def delete_project_job(ctx: JobContext) -> dict:
+    """プロジェクトの削除。タスクを子孫から順に（path の降順）少しずつ消し、最後にプロジェクトを消す。
+    途中でキャンセルした場合、それまでに消したタスクは戻らない。"""
+    db, project_id = ctx.db, ctx.project_id
+    total = db.query(func.count(Task.id)).filter(Task.project_id == project_id).scalar()
+    ctx.progress(0, total)
+
+    deleted = 0
+    while True:
+        # 子孫の path は祖先の path を接頭辞に持つので、降順なら子が親より先に来る（カスケードで大きく消えない）
+        chunk = [
+            task_id for (task_id,) in db.query(Task.id)
+            .filter(Task.project_id == project_id)
+            .order_by(Task.path.desc())
+            .limit(PROJECT_JOB_CHUNK)
+        ]
+        if not chunk:
+            break
+        db.execute(delete(Task).where(Task.id.in_(chunk)), execution_options={"synchronize_session": False})
+        db.commit()
+        deleted += len(chunk)
+        ctx.progress(min(deleted, total), total)
+
+    # メンバーは ON DELETE CASCADE で消える
+    db.execute(delete(Project).where(Project.id == project_id), execution_options={"synchronize_session": False})
+    db.commit()
+    invalidate_project_roles(db, project_id)
+    hub.publish(project_id, "project.deleted")
+    hub.close_project(project_id)
+    return {"deleted_tasks": deleted}
+
+
+@job_handler("project.reassign")
+def reassign_project_tasks_job(ctx: JobContext) -> dict:
+    """プロジェクト内で from_user_id が担当のタスクをすべて to_user_id に付け替える（履歴付き）。"""
+    db, project_id = ctx.db, ctx.project_id
+    from_user_id, to_user_id = ctx.params["from_user_id"], ctx.params["to_user_id"]
+    if db.get(Project, project_id) is None:
+        raise JobError("プロジェクトが見つかりません")
+    if from_user_id == to_user_id:
+        # 付け替えても対象が減らないので、何もしない（しないと終わらない）
+        return {"reassigned_tasks": 0}
+    total = (
+        db.query(func.count(Task.id))
+        .filter(Task.project_id == project_id, Task.assignee_id == from_user_id)
+        .scalar()
+    )
+    ctx.progress(0, total)
+
+    reassigned = 0
+    while True:
+        ids = reassign_tasks(db, project_id, from_user_id, to_user_id, ctx.user_id, limit=PROJECT_JOB_CHUNK)
+        db.commit()
+        if not ids:
+            break
+        reassigned += len(ids)
+        if hub.has_subscribers(project_id):
+            tasks = db.query(Task).filter(Task.id.in_(ids)).all()
+            hub.publish(project_id, "tasks.updated", tasks=[TaskRead.model_validate(t, from_attributes=True) for t in tasks])
+        ctx.progress(min(reassigned, total), total)
+    return {"reassigned_tasks": reassigned}
+
+
+@job_handler("project.export")
+def export_project_job(ctx: JobContext) -> dict:
+    """プロジェクト・メンバー・タスクを JSON にまとめる（結果は GET /jobs/{job_id} の result）。"""
+    db, project_id = ctx.db, ctx.project_id
+    project = db.get(Project, project_id)
+    if project is None:
+        raise JobError("プロジェクトが見つかりません")
+    project_data = {
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "creator_id": project.creator_id,
+        "created_at": project.created_at,
+        "updated_at": project.updated_at,
+    }
+    total = db.query(func.count(Task.id)).filter(Task.project_id == project_id).scalar()
+    ctx.progress(0, total)
+
+    members = [
+        ProjectMemberRead(
+            id=member.id,
+            project_id=member.project_id,
+            user_id=member.user_id,
+            role=member.role,
+            invited_at=member.invited_at,
+            username=username or "Unknown",
+            icon=icon,
+        )
+        for member, username, icon in db.query(ProjectMember, User.username, User.icon)
+        .outerjoin(User, User.id == ProjectMember.user_id)
+        .filter(ProjectMember.project_id == project_id)
+        .order_by(ProjectMember.id)
+    ]
+
+    tasks = []
+    last_id = 0
+    while True:
+        chunk = (
+            db.query(Task)
+            .filter(Task.project_id == project_id, Task.id > last_id)
+            .order_by(Task.id)
+            .limit(PROJECT_JOB_CHUNK)
+            .all()
+        )
+        if not chunk:
+            break
+        tasks += [TaskRead.model_validate(task, from_attributes=True) for task in chunk]
+        last_id = chunk[-1].id
+        # 読み取りだけなのでトランザクションを閉じてから進捗を記録する
+        db.rollback()
+        ctx.progress(len(tasks), total)
+
+    return {"project": project_data, "members": members, "tasks": tasks}
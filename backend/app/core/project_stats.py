@@ -0,0 +1,79 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+from app.models.user import User
+
+# プロジェクト単位のタスク集計。プロジェクト数に関係なく GROUP BY 2回で計算する。
+
+JST = ZoneInfo("Asia/Tokyo")
+STATUS_COMPLETED = "completed"
+
+
+def _empty_stats(project_id: int) -> dict:
+    return {
+        "project_id": project_id,
+        "total": 0,
+        "by_status": {},
+        "by_priority": {},
+        "by_assignee": [],
+        "overdue": 0,
+        "root_tasks": 0,
+        "subtasks": 0,
+        "completion_rate": 0.0,
+    }
+
+
+def project_stats(db: Session, project_ids) -> dict[int, dict]:
+    """project_ids それぞれの集計（schemas.project.ProjectStats の形の dict）を返す。
+    権限チェックは呼び出し側で済ませておくこと。"""
+    stats = {project_id: _empty_stats(project_id) for project_id in project_ids}
+    if not stats:
+        return stats
+
+    # deadline はタイムゾーンなし（JST）で保存されている
+    now = datetime.now(JST).replace(tzinfo=None)
+    is_root = case((Task.parent_id.is_(None), 1), else_=0)
+    is_overdue = case(
+        (and_(Task.deadline.is_not(None), Task.deadline < now, Task.status != STATUS_COMPLETED), 1),
+        else_=0,
+    )
+
+    # ① ステータス・優先度・親子・期限切れの組み合わせごとの件数（組み合わせは少ないので Python 側で畳む）
+    rows = (
+        db.query(Task.project_id, Task.status, Task.priority, is_root, is_overdue, func.count(Task.id))
+        .filter(Task.project_id.in_(stats.keys()))
+        .group_by(Task.project_id, Task.status, Task.priority, is_root, is_overdue)
+        .all()
+    )
+    for project_id, task_status, priority, root, overdue, count in rows:
+        s = stats[project_id]
+        s["total"] += count
+        s["by_status"][task_status] = s["by_status"].get(task_status, 0) + count
+        s["by_priority"][priority] = s["by_priority"].get(priority, 0) + count
+        s["root_tasks" if root else "subtasks"] += count
+        if overdue:
+            s["overdue"] += count
+
+    # ② 担当者ごとの件数（担当者なしは assignee_id=None）
+    completed = func.sum(case((Task.status == STATUS_COMPLETED, 1), else_=0))
+    rows = (
+        db.query(Task.project_id, Task.assignee_id, User.username, func.count(Task.id), completed)
+        .outerjoin(User, User.id == Task.assignee_id)
+        .filter(Task.project_id.in_(stats.keys()))
+        .group_by(Task.project_id, Task.assignee_id, User.username)
+        .order_by(Task.project_id, func.count(Task.id).desc(), Task.assignee_id)
+        .all()
+    )
+    for project_id, assignee_id, username, count, done in rows:
+        stats[project_id]["by_assignee"].append(
+            {"assignee_id": assignee_id, "username": username, "total": count, "completed": done or 0}
+        )
+
+    for s in stats.values():
+        if s["total"]:
+            s["completion_rate"] = round(s["by_status"].get(STATUS_COMPLETED, 0) * 100 / s["total"], 1)
+    return stats
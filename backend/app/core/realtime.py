@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+from contextlib import suppress
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+
+load_dotenv()
+
+# プロジェクト単位のリアルタイム通知（WebSocket）のファンアウト。
+# - 接続ごとに上限付きのキューを持ち、ルーターはコミット後に publish するだけ（送信を待たない）。
+# - イベントは1回だけ JSON にして全購読者で共有する。待機中の接続はキューを待つコルーチンだけなので軽い。
+# - 遅い購読者のキューがあふれたら溜まった分を捨てて "resync" を1件だけ送る。
+#   クライアントは GET /tasks/projects/{id}/changes で追いつく。
+# - ハブはプロセス内なので、複数ワーカー構成では同じワーカーに接続した購読者にしか届かない。
+#   その場合も取りこぼしは resync と差分同期で補える。
+
+# 接続ごとに溜められるイベント数
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "256"))
+# 無通信の接続に ping を送る間隔（秒）。切断済みの接続の検出も兼ねる。
+REALTIME_PING_INTERVAL = float(os.getenv("REALTIME_PING_INTERVAL", "25"))
+# 1件の送信にかけられる時間（秒）。超えたら切断する。
+REALTIME_SEND_TIMEOUT = float(os.getenv("REALTIME_SEND_TIMEOUT", "10"))
+
+RESYNC = json.dumps({"type": "resync"})
+PING = json.dumps({"type": "ping"})
+# キューに入れると購読を終了させる番兵
+CLOSE = object()
+
+
+class Subscriber:
+    __slots__ = ("project_id", "user_id", "queue", "loop", "overflows")
+
+    def __init__(self, project_id: int, user_id: int, maxsize: int):
+        self.project_id = project_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        # キューを待っているイベントループ（キューの操作はこのループ上で行う）
+        self.loop = asyncio.get_running_loop()
+        self.overflows = 0
+
+    def offer(self, message) -> None:
+        try:
+            self.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+        # あふれたら未送信分を捨て、追いつくよう促す（CLOSE は残す）
+        self.overflows += 1
+        closing = False
+        while not self.queue.empty():
+            if self.queue.get_nowait() is CLOSE:
+                closing = True
+        self.queue.put_nowait(CLOSE if closing or message is CLOSE else RESYNC)
+
+
+class ProjectHub:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._channels: dict[int, set[Subscriber]] = {}
+
+    # --- 購読側（イベントループ上で呼ぶ） ---
+
+    def subscribe(self, project_id: int, user_id: int) -> Subscriber:
+        subscriber = Subscriber(project_id, user_id, self.queue_size)
+        self._channels.setdefault(project_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        channel = self._channels.get(subscriber.project_id)
+        if channel is None:
+            return
+        channel.discard(subscriber)
+        if not channel:
+            del self._channels[subscriber.project_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(channel) for channel in self._channels.values())
+
+    # --- 配信側（ルーターから。スレッドプール上からでもよい） ---
+
+    def has_subscribers(self, project_id: int) -> bool:
+        """購読者がいなければ、イベント用の追加クエリやシリアライズを省略してよい。"""
+        return bool(self._channels.get(project_id))
+
+    def publish(self, project_id: int, event_type: str, **payload) -> None:
+        """コミット後に呼ぶ。payload は JSON 化できる値（pydantic モデル・dict など）。"""
+        if not self.has_subscribers(project_id):
+            return
+        message = json.dumps(
+            jsonable_encoder({"type": event_type, "project_id": project_id, **payload}),
+            ensure_ascii=False,
+        )
+        self._fan_out(project_id, message, None)
+
+    def close_user(self, project_id: int, user_id: int) -> None:
+        """メンバーから外れたユーザーの購読を終了させる。"""
+        self._fan_out(project_id, CLOSE, user_id)
+
+    def close_project(self, project_id: int) -> None:
+        self._fan_out(project_id, CLOSE, None)
+
+    def _fan_out(self, project_id: int, message, user_id: int | None) -> None:
+        # キューはスレッドセーフではないので、購読者のループごとにまとめてループ上で積む
+        by_loop: dict[asyncio.AbstractEventLoop, list[Subscriber]] = {}
+        for subscriber in list(self._channels.get(project_id, ())):
+            if user_id is None or subscriber.user_id == user_id:
+                by_loop.setdefault(subscriber.loop, []).append(subscriber)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop, subscribers in by_loop.items():
+            if loop is running:
+                # DB_ASYNC（run_sync）ではイベントループ上で呼ばれる
+                _offer_all(subscribers, message)
+            else:
+                # 接続の終了と行き違いでループが閉じていれば届け先はもうない
+                with suppress(RuntimeError):
+                    loop.call_soon_threadsafe(_offer_all, subscribers, message)
+
+
+def _offer_all(subscribers: list[Subscriber], message) -> None:
+    for subscriber in subscribers:
+        subscriber.offer(message)
+
+
+hub = ProjectHub(REALTIME_QUEUE_SIZE)
@@ -0,0 +1,267 @@
+import html
+import logging
+import os
+import re
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, column, event, func, literal_column, select, table, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+
+load_dotenv()
+
+# タスクの全文検索（タイトル・説明）。
+# - SQLite: FTS5 の trigram トークナイザ（日本語も3文字単位で部分一致）。
+#   外部コンテンツ表 tasks_fts をトリガーで tasks と同期するので、ORM 以外の一括 UPDATE/DELETE でもずれない。
+# - PostgreSQL: pg_trgm の GIN 索引（gin_trgm_ops）。検索条件は LIKE と同じ ILIKE の部分一致のままで、
+#   それを索引で絞り込む。空白で区切らない日本語も SQLite と同じく文中一致する。拡張 pg_trgm が必要。
+# 索引がない DB（未マイグレーション、FTS5 なしの SQLite、pg_trgm を作れない PostgreSQL など）では
+# 従来の LIKE 検索にフォールバックする。
+
+# false にすると常に LIKE 検索（全文検索索引は作らない）
+TASK_SEARCH_FTS = os.getenv("TASK_SEARCH_FTS", "true").lower() in ("1", "true", "yes", "on")
+# trigram は3文字未満の語に一致しないので、それより短い語を含む検索は LIKE で行う
+FTS_MIN_TERM_LENGTH = 3
+# スニペットの強調マーカー。本文は HTML エスケープしてからマーカーを付けるので、そのまま HTML として表示できる。
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+SNIPPET_TOKENS = 12
+# PostgreSQL ではスニペットをアプリ側で切り出す（文字数）
+SNIPPET_CHARS = 64
+# DB 側ではエスケープ前の本文に区切り用の制御文字を入れておき、エスケープ後に SNIPPET_OPEN/CLOSE へ置き換える
+_RAW_OPEN = "\x02"
+_RAW_CLOSE = "\x03"
+# 順位付けでのタイトルの重み（説明は 1.0）
+TITLE_WEIGHT = 10.0
+
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    # ステータス変更などでは索引を触らない
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+]
+_SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS tasks_fts_au",
+    "DROP TRIGGER IF EXISTS tasks_fts_ad",
+    "DROP TRIGGER IF EXISTS tasks_fts_ai",
+    "DROP TABLE IF EXISTS tasks_fts",
+]
+
+_PG_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_trgm ON tasks USING GIN (title gin_trgm_ops, description gin_trgm_ops)",
+]
+_PG_DROP = ["DROP INDEX IF EXISTS ix_tasks_search_trgm"]
+
+_tasks_fts = table("tasks_fts", column("rowid"), column("title"), column("description"))
+
+logger = logging.getLogger(__name__)
+
+# 接続先ごとの「全文検索索引があるか」（プロセス内で1回だけ調べる）
+_available: dict[str, bool] = {}
+
+
+def install_search_index(conn) -> None:
+    """全文検索索引を作る（作成済みなら何もしない）。SQLite では既存行も索引に入れ直す。
+    tasks テーブル作成時とマイグレーションから呼ぶ。"""
+    if not TASK_SEARCH_FTS:
+        return
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for ddl in _SQLITE_DDL:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        try:
+            # 失敗してもテーブル作成・マイグレーションのトランザクションを巻き込まないようセーブポイント内で作る
+            with conn.begin_nested():
+                for ddl in _PG_DDL:
+                    conn.exec_driver_sql(ddl)
+        except DBAPIError:
+            logger.warning("pg_trgm 拡張を作成できないため、タスク検索は索引なしの部分一致で行います")
+    _available.pop(str(conn.engine.url), None)
+
+
+def drop_search_index(conn) -> None:
+    dialect = conn.dialect.name
+    for ddl in _SQLITE_DROP if dialect == "sqlite" else _PG_DROP if dialect == "postgresql" else []:
+        conn.exec_driver_sql(ddl)
+    _available.pop(str(conn.engine.url), None)
+
+
+@event.listens_for(Task.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    try:
+        install_search_index(connection)
+    except Exception:
+        # FTS5（trigram）が使えない SQLite でもテーブル作成自体は成功させる。検索は LIKE になる。
+        for ddl in _SQLITE_DROP if connection.dialect.name == "sqlite" else []:
+            connection.exec_driver_sql(ddl)
+
+
+def search_available(db: Session) -> bool:
+    if not TASK_SEARCH_FTS:
+        return False
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _available:
+        if bind.dialect.name == "sqlite":
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+            ).first()
+        elif bind.dialect.name == "postgresql":
+            found = db.execute(text("SELECT to_regclass('ix_tasks_search_trgm')")).scalar()
+        else:
+            found = None
+        _available[key] = found is not None
+    return _available[key]
+
+
+def search_terms(q: str) -> list[str]:
+    return q.split()
+
+
+def _use_fts(db: Session, terms: list[str]) -> bool:
+    if not terms or not search_available(db):
+        return False
+    if db.get_bind().dialect.name == "sqlite":
+        return all(len(term) >= FTS_MIN_TERM_LENGTH for term in terms)
+    return True
+
+
+def _fts5_query(terms: list[str]) -> str:
+    # 各語をフレーズとして引用し（演算子として解釈させない）、AND で結ぶ。
+    # trigram は部分一致なので、入力途中の語（前方一致）にもそのまま一致する。
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    # 入力の % _ \ はワイルドカードではなく文字として扱う（escape="\\" と組で使う）
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _like_filter(terms: list[str]):
+    # 従来の部分一致（全語を含むタスク）
+    patterns = [_like_pattern(term) for term in terms]
+    return and_(
+        *(Task.title.ilike(pattern, escape="\\") | Task.description.ilike(pattern, escape="\\") for pattern in patterns)
+    )
+
+
+def task_search_filter(db: Session, q: str):
+    """タスク一覧の search 条件。SQLite は FTS5 の索引があればそれを使い、なければ LIKE。
+    PostgreSQL は常に ILIKE（pg_trgm の索引があれば索引で絞り込まれる）。"""
+    terms = search_terms(q)
+    if not terms:
+        return None
+    if _use_fts(db, terms) and db.get_bind().dialect.name == "sqlite":
+        matched = select(_tasks_fts.c.rowid).where(text("tasks_fts MATCH :fts_query").bindparams(fts_query=_fts5_query(terms)))
+        return Task.id.in_(matched)
+    return _like_filter(terms)
+
+
+def _render_snippet(raw: str | None) -> str | None:
+    """DB が返した抜粋を HTML エスケープし、一致箇所を SNIPPET_OPEN/CLOSE で囲む。"""
+    if raw is None:
+        return None
+    # 本文に区切り文字が紛れ込んでいてもタグの対応が崩れないよう、開閉の順に合うものだけを変換する
+    parts = []
+    inside = False
+    for piece in re.split(f"([{_RAW_OPEN}{_RAW_CLOSE}])", raw):
+        if piece == _RAW_OPEN:
+            if not inside:
+                parts.append(SNIPPET_OPEN)
+                inside = True
+        elif piece == _RAW_CLOSE:
+            if inside:
+                parts.append(SNIPPET_CLOSE)
+                inside = False
+        else:
+            parts.append(html.escape(piece))
+    if inside:
+        parts.append(SNIPPET_CLOSE)
+    return "".join(parts)
+
+
+def _cut_snippet(body: str | None, terms: list[str]) -> str | None:
+    """最初の一致箇所のまわりを SNIPPET_CHARS 文字ほど切り出し、HTML エスケープして一致箇所を囲む。"""
+    if body is None:
+        return None
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    first = pattern.search(body)
+    start = 0 if first is None else max(0, first.start() - SNIPPET_CHARS // 4)
+    end = min(len(body), start + SNIPPET_CHARS)
+    if first is not None:
+        end = max(end, first.end())
+    parts = ["…"] if start > 0 else []
+    pos = start
+    for match in pattern.finditer(body, start, end):
+        parts += [html.escape(body[pos:match.start()]), SNIPPET_OPEN, html.escape(match.group()), SNIPPET_CLOSE]
+        pos = match.end()
+    parts.append(html.escape(body[pos:end]))
+    if end < len(body):
+        parts.append("…")
+    return "".join(parts)
+
+
+def search_tasks(db: Session, q: str, filters: list, limit: int) -> list[tuple]:
+    """関連度順の検索。(Task, score, title_snippet, description_snippet) のリストを返す。
+    score は大きいほど関連度が高い。LIKE フォールバック時は score=0 で更新日時の新しい順（スニペットはアプリ側で切り出す）。"""
+    terms = search_terms(q)
+    if not terms:
+        return []
+    if not _use_fts(db, terms):
+        rows = (
+            db.query(Task)
+            .filter(*filters, _like_filter(terms))
+            .order_by(Task.updated_at.desc(), Task.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [(task, 0.0, _cut_snippet(task.title, terms), _cut_snippet(task.description, terms)) for task in rows]
+
+    if db.get_bind().dialect.name == "postgresql":
+        # pg_trgm の語類似度で順位付けする。スニペットは一致条件（ILIKE）と同じ文字単位でアプリ側で切り出す
+        phrase = " ".join(terms)
+        score = TITLE_WEIGHT * func.word_similarity(phrase, Task.title) + func.word_similarity(
+            phrase, func.coalesce(Task.description, "")
+        )
+        rows = (
+            db.query(Task, score)
+            .filter(*filters, _like_filter(terms))
+            .order_by(score.desc(), Task.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            (task, score, _cut_snippet(task.title, terms), _cut_snippet(task.description, terms))
+            for task, score in rows
+        ]
+
+    fts = literal_column("tasks_fts")
+    # bm25 は小さいほど関連度が高いので符号を反転して返す
+    score = -func.bm25(fts, TITLE_WEIGHT, 1.0)
+    title_snippet = func.snippet(fts, 0, _RAW_OPEN, _RAW_CLOSE, "…", SNIPPET_TOKENS)
+    description_snippet = func.snippet(fts, 1, _RAW_OPEN, _RAW_CLOSE, "…", SNIPPET_TOKENS)
+    rows = (
+        db.query(Task, score, title_snippet, description_snippet)
+        .join(_tasks_fts, _tasks_fts.c.rowid == Task.id)
+        .filter(text("tasks_fts MATCH :fts_query").bindparams(fts_query=_fts5_query(terms)))
+        .filter(*filters)
+        .order_by(score.desc(), Task.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [(task, score, _render_snippet(title), _render_snippet(description)) for task, score, title, description in rows]
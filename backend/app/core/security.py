@@ -1,9 +1,106 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+load_dotenv()
+
+# bcrypt のコスト。これより弱いハッシュはログイン成功時に自動で再ハッシュされる。
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# パスワード処理専用スレッド数（bcrypt は GIL を解放するのでスレッドで並列化できる）
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+# 実行待ちの上限。超えたら 503 を返して他のAPIを巻き込まないようにする。
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """検証に成功し、かつハッシュが古い設定のものなら新しいハッシュも返す。"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class _PasswordExecutor:
+    """パスワード処理を Starlette のスレッドプールから切り離すための専用実行器。
+    実行中 + 待機中の件数を数えて、上限を超えた要求は即座に拒否する。"""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _run(self, fn, args):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _done(self, future) -> None:
+        # キャンセルされて実行されなかった場合もここで件数を戻す
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._completed += 1
+
+    async def submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="混雑しています。しばらくしてから再試行してください",
+                )
+            self._pending += 1
+        future = self._executor.submit(self._run, fn, args)
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "queue_limit": self.queue_limit,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+            }
+
+
+_password_executor = _PasswordExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _password_executor.submit(hash_password, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _password_executor.submit(verify_and_update_password, plain_password, hashed_password)
+
+
+def password_hash_stats() -> dict:
+    """キュー深さなどの監視用メトリクス。"""
+    return _password_executor.stats()
@@ -0,0 +1,75 @@
+from sqlalchemy import String, func, literal, update
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+
+# タスク階層の materialized path 操作。
+# Task.path は根から親までの id を "/1/5/" の形で持つ（自分自身は含まない。根は "/"）。
+# 子孫は「path が subtree_prefix(task) で始まる」タスクなので、前方一致の範囲検索1回で取れる。
+
+
+def child_path(parent: Task | None) -> str:
+    """parent の直下に置くタスクの path。"""
+    if parent is None:
+        return "/"
+    return f"{parent.path}{parent.id}/"
+
+
+def child_depth(parent: Task | None) -> int:
+    return 0 if parent is None else parent.depth + 1
+
+
+def subtree_prefix(task: Task) -> str:
+    """task の子孫が共通して持つ path の接頭辞。"""
+    return child_path(task)
+
+
+def _prefix_range(prefix: str) -> tuple:
+    # LIKE 'prefix%' はDBによって索引が効かないので範囲比較にする。
+    # 接頭辞は必ず "/" で終わり、"/" の次の文字は "0" なので上限は末尾を "0" にした文字列。
+    # バイト順で比較される前提（Task.path は PostgreSQL では COLLATE "C"）。
+    return (Task.path >= prefix, Task.path < prefix[:-1] + "0")
+
+
+def descendants_filter(task: Task) -> tuple:
+    """task の子孫（自分は含まない）を絞り込む条件。"""
+    return (Task.project_id == task.project_id, *_prefix_range(subtree_prefix(task)))
+
+
+def ancestor_ids(task: Task) -> list[int]:
+    """根から親までの id（根が先頭）。"""
+    return [int(part) for part in task.path.strip("/").split("/") if part]
+
+
+def would_create_cycle(task: Task, new_parent: Task) -> bool:
+    """new_parent が task 自身か子孫なら True（付け替えると循環する）。"""
+    return new_parent.id == task.id or new_parent.path.startswith(subtree_prefix(task))
+
+
+def move_subtree(db: Session, task: Task, new_parent: Task | None) -> None:
+    """task を new_parent の下へ移し、子孫の path/depth を UPDATE 1文で書き換える。
+    循環チェックは呼び出し側で would_create_cycle を使って済ませておくこと。
+    task 自身の parent_id/path/depth は ORM 側の変更として commit 時に書き込まれる。"""
+    old_prefix = subtree_prefix(task)
+    new_path = child_path(new_parent)
+    new_depth = child_depth(new_parent)
+    delta = new_depth - task.depth
+
+    task.parent_id = new_parent.id if new_parent is not None else None
+    task.path = new_path
+    task.depth = new_depth
+
+    new_prefix = subtree_prefix(task)
+    if new_prefix == old_prefix:
+        return
+    db.execute(
+        update(Task)
+        .where(Task.project_id == task.project_id, *_prefix_range(old_prefix))
+        .values(
+            path=literal(new_prefix, String) + func.substr(Task.path, len(old_prefix) + 1),
+            depth=Task.depth + delta,
+            # 位置が変わっただけなので子孫の更新日時は変えない
+            updated_at=Task.updated_at,
+        ),
+        execution_options={"synchronize_session": False},
+    )
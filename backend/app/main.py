@@ -1,17 +1,29 @@
+from contextlib import asynccontextmanager
 from typing import Union
 
 from fastapi import FastAPI
 from app.core import auth
 from app.database.session import engine, Base
-from app.models import user, task, project, project_member
-from app.routers import tasks, users, auth, projects
+from app.models import user, task, project, project_member, task_change, job
+from app.core import search  # noqa: F401  (tasks テーブル作成時に全文検索索引も作る)
+from app.core import change_log  # noqa: F401  (テーブル作成時に差分同期用のトリガーも作る)
+from app.core.jobs import runner
+from app.routers import tasks, users, auth, projects, jobs
 from fastapi.middleware.cors import CORSMiddleware
 #認証はauth,タスク管理はtask,ユーザー管理はuser,ファイルアップロードはimagesに記述する。images ,
 
 Base.metadata.create_all(bind=engine)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 前回の起動から残っているジョブも実行する（ジョブ登録時にも起動するので、ここで起動しなくても動く）
+    runner.start()
+    yield
+    runner.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 origins = [
@@ -40,3 +52,4 @@ app.include_router(users.router)
 # teams機能はプロジェクトへ移行のため退役
 # app.include_router(teams.router)
 app.include_router(projects.router)
+app.include_router(jobs.router)
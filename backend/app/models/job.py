@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index
+from datetime import datetime
+from app.database.session import Base
+from zoneinfo import ZoneInfo
+
+JST = ZoneInfo("Asia/Tokyo")
+
+class Job(Base):
+    """バックグラウンドジョブ（app/core/jobs.py のワーカーが実行する）。
+    状態: queued → running → succeeded / failed / cancelled（失敗は再試行のため queued に戻ることがある）。"""
+    __tablename__ = "jobs"
+    # ワーカーが次に実行するジョブを探す用 / 自分のジョブ一覧用
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_created_by_id", "created_by", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # 処理の種類（例: project.delete）。app/core/jobs.py の job_handler で登録した名前。
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    # 引数・結果は JSON 文字列
+    params = Column(Text, nullable=False, default="{}")
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+
+    # 対象のプロジェクト（プロジェクト削除ジョブでも記録を残すため外部キーにしない）
+    project_id = Column(Integer, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # 進捗（progress_total が不明な間は None）
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # 実行中のジョブのキャンセル要求（ハンドラーが区切りごとに確認する）
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+
+    # この時刻以降に実行する（再試行のバックオフ用）
+    run_after = Column(DateTime, default=lambda: datetime.now(JST))
+    # 実行中のワーカーが定期的に更新する。途絶えたジョブは別のワーカーが引き継ぐ。
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(JST))
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
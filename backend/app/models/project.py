@@ -12,11 +12,14 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
 
     created_at = Column(DateTime, default=lambda: datetime.now(JST))
     updated_at = Column(DateTime, default=lambda: datetime.now(JST), onupdate=lambda: datetime.now(JST))
+    # タスク変更の通番（task_changes.seq の採番元）。DB トリガーが更新するのでアプリからは書き込まない。
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
 
     creator = relationship("User")
-    members = relationship("ProjectMember", back_populates="project", cascade="all, delete")
-    tasks = relationship("Task", back_populates="project", cascade="all, delete")
+    # passive_deletes: 削除時にメンバー・タスクを読み込まず、DB の ON DELETE CASCADE に任せる
+    members = relationship("ProjectMember", back_populates="project", cascade="all, delete", passive_deletes=True)
+    tasks = relationship("Task", back_populates="project", cascade="all, delete", passive_deletes=True)
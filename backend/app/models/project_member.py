@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.session import Base
@@ -8,14 +8,22 @@ JST = ZoneInfo("Asia/Tokyo")
 
 class ProjectMember(Base):
     __tablename__ = "project_members"
+    # user_project_role の検索用。同じユーザーの重複参加もDB側で防ぐ。
+    # user_id 単独は「自分の参加プロジェクト一覧」用。
+    __table_args__ = (
+        Index("uq_project_members_project_id_user_id", "project_id", "user_id", unique=True),
+        Index("ix_project_members_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     # role: ADMIN or VIEWER
     role = Column(String, nullable=False, default="VIEWER")
 
     invited_at = Column(DateTime, default=lambda:datetime.now(JST))
+    # ロール変更・ユーザーのアイコン変更の検知用（メンバー一覧の ETag に使う）
+    updated_at = Column(DateTime, default=lambda: datetime.now(JST), onupdate=lambda: datetime.now(JST))
 
     project = relationship("Project", back_populates="members")
     user = relationship("User", back_populates="project_memberships")
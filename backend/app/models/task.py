@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from datetime import datetime,timezone
 from app.database.session import Base
@@ -8,14 +8,35 @@ JST = ZoneInfo("Asia/Tokyo")
 
 class Task(Base):
     __tablename__ = "tasks"
+    # 一覧・絞り込みの実際のクエリ形に合わせた複合インデックス
+    # （list_project_tasks / list_children / list_my_assigned_tasks）
+    __table_args__ = (
+        Index("ix_tasks_project_id_parent_id", "project_id", "parent_id"),
+        Index("ix_tasks_project_id_updated_at", "project_id", "updated_at"),
+        Index("ix_tasks_assignee_id_updated_at", "assignee_id", "updated_at"),
+        Index("ix_tasks_parent_id", "parent_id"),
+        Index("ix_tasks_project_id_path", "project_id", "path"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
     # プロジェクト紐付け（必須：すべてのタスクはプロジェクト配下）
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    # 削除は DB の ON DELETE CASCADE に任せる（プロジェクト・親タスクの削除でまとめて消える）
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
 
     # 階層構造（親参照）。NULLなら親タスク。
-    parent_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=True)
+    # 階層インデックス（materialized path）。根から親までの id を "/1/5/" の形で持つ（根は "/"）。
+    # 祖先・子孫の検索や循環チェックに使う。更新は app/core/task_tree.py 経由で行うこと。
+    # 子孫の範囲検索はバイト順の比較が前提なので、PostgreSQL では照合順序を "C" にする
+    # （en_US.UTF-8 などでは "/" や数字がバイト順に並ばず、子孫を取りこぼす）。SQLite は既定でバイト順。
+    path = Column(
+        String().with_variant(String(collation="C"), "postgresql"),
+        nullable=False,
+        default="/",
+        server_default="/",
+    )
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
 
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
@@ -41,10 +62,11 @@ class Task(Base):
 
     # リレーション
     project = relationship("Project", back_populates="tasks")
+    # passive_deletes: 削除時に子タスクを読み込まず、DB のカスケードに任せる
     parent = relationship(
         "Task",
         remote_side=[id],
-        backref=backref("children", cascade="all, delete-orphan")
+        backref=backref("children", cascade="all, delete-orphan", passive_deletes=True)
     )
     assignee = relationship("User", foreign_keys=[assignee_id])
     created_by_user = relationship("User", foreign_keys=[created_by])
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, Index
+from app.database.session import Base
+
+
+class TaskChange(Base):
+    """差分同期用の変更ログ。タスクごとに最新の変更1行だけを持つ（task_id で上書き）。
+    行の追加・更新は DB トリガーが行う（app/core/change_log.py）。アプリから直接書き込まないこと。"""
+    __tablename__ = "task_changes"
+    __table_args__ = (
+        Index("ix_task_changes_project_id_seq", "project_id", "seq"),
+    )
+
+    # 削除済みタスクの id も残すので tasks への外部キーは張らない
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    # プロジェクト内の変更通番（projects.change_seq から採番）。時計に依存しない。
+    seq = Column(Integer, nullable=False)
+    # True なら削除済み（トゥームストーン）
+    deleted = Column(Boolean, nullable=False, default=False)
@@ -1,13 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime,timezone
 from app.database.session import Base
 
 class TaskHistory(Base):
     __tablename__ = "task_histories"
+    __table_args__ = (
+        Index("ix_task_histories_task_id_created_at", "task_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    # タスクの削除で履歴も消える（孤立した履歴を残さない）
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     # action_type: CREATE / UPDATE / DELETE / STATUS_CHANGE / ASSIGNEE_CHANGE / PRIORITY_CHANGE
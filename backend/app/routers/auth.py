@@ -3,9 +3,10 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 
+from app.core.auth import get_current_user
 from app.models.user import User
-from app.database.session import get_db
-from app.core.security import verify_password
+from app.database.session import get_request_db, run_db
+from app.core.security import verify_and_update_password_async, password_hash_stats
 from app.schemas.auth import Token
 
 import os
@@ -21,28 +22,49 @@ router = APIRouter(
     tags=["auth"]
 )
 
+def _find_user(db: Session, username: str) -> User | None:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _save_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.add(user)
+    db.commit()
+
+
+# bcrypt は専用の実行器で動かし、DBアクセスは run_db（スレッドプール or AsyncSession）に渡す。
+# ログインが集中しても他のエンドポイントのスレッドを占有しないように async にしている。
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     # ユーザー名で検索
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await run_db(db, _find_user, form_data.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="ユーザー名またはパスワードが間違っています"
         )
 
-    # パスワード検証
-    if not verify_password(form_data.password, user.hashed_password):
+    # パスワード検証（コスト設定が上がっていれば再ハッシュして保存）
+    valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="ユーザー名またはパスワードが間違っています"
         )
+    if new_hash:
+        await run_db(db, _save_password_hash, user, new_hash)
 
     # JWT 作成
     payload = {"sub": str(user.id)}
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
     return Token(access_token=token)
+
+
+@router.get("/metrics", dependencies=[Depends(get_current_user)])
+def password_metrics():
+    # パスワード処理キューの監視用（実行中・待機中・拒否件数）。内部の設定値を含むのでログインが必要。
+    return password_hash_stats()
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import CurrentUser, get_current_user
+from app.core.jobs import (
+    FINISHED_STATUSES,
+    STATUS_CANCELLED,
+    STATUS_FAILED,
+    job_accepted,
+    job_to_read,
+    request_cancel,
+    requeue,
+)
+from app.database.session import get_db, retry_on_busy, async_endpoint
+from app.models.job import Job
+from app.schemas.job import JobRead
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# 自分のジョブ一覧で返す最大件数
+JOB_LIST_MAX = 100
+
+
+def _get_own_job(db: Session, job_id: int, user_id: int) -> Job:
+    # 他人のジョブは存在も明かさない
+    job = db.query(Job).filter(Job.id == job_id, Job.created_by == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+
+@router.get("/", response_model=list[JobRead])
+@async_endpoint
+def list_my_jobs(
+    status: str | None = None,
+    limit: int = Query(20, ge=1, le=JOB_LIST_MAX),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """自分が登録したジョブ（新しい順）。"""
+    q = db.query(Job).filter(Job.created_by == current_user.id)
+    if status is not None:
+        q = q.filter(Job.status == status)
+    return [job_to_read(job) for job in q.order_by(Job.id.desc()).limit(limit)]
+
+
+@router.get("/{job_id}", response_model=JobRead)
+@async_endpoint
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """ジョブの状態・進捗。完了していれば result（失敗なら error）も返す。"""
+    return job_to_read(_get_own_job(db, job_id, current_user.id))
+
+
+@router.post("/{job_id}/cancel", response_model=JobRead)
+@async_endpoint
+@retry_on_busy
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """待機中のジョブは取り消し、実行中のジョブは次の区切りで止める（cancel_requested=true）。"""
+    job = _get_own_job(db, job_id, current_user.id)
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail="ジョブはすでに終了しています")
+    request_cancel(db, job)
+    return job_to_read(job)
+
+
+@router.post("/{job_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+@async_endpoint
+@retry_on_busy
+def retry_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """失敗・取り消したジョブを最初からやり直す。"""
+    job = _get_own_job(db, job_id, current_user.id)
+    if job.status not in (STATUS_FAILED, STATUS_CANCELLED):
+        raise HTTPException(status_code=409, detail="失敗または取り消したジョブだけやり直せます")
+    requeue(db, job)
+    return job_accepted(job)
@@ -1,17 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+from contextlib import suppress
 
-from app.core.auth import get_current_user
-from app.database.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session, contains_eager, joinedload
+
+from app.core.auth import CurrentUser, authenticate_token, get_current_user
+from app.core.realtime import CLOSE, PING, REALTIME_PING_INTERVAL, REALTIME_SEND_TIMEOUT, hub
+from app.database.session import get_db, retry_on_busy, async_endpoint, run_in_new_session
 from app.models.user import User
 from app.models.project import Project
 from app.models.project_member import ProjectMember
 from app.models.task import Task
-from app.core.permissions import ROLE_ADMIN, ROLE_VIEWER, user_project_role
+from app.core.permissions import (
+    ROLE_ADMIN,
+    ROLE_VIEWER,
+    user_project_role,
+    invalidate_project_roles,
+    prime_project_roles,
+)
+from app.core.etag import check_if_match, is_not_modified, make_etag, not_modified, set_etag
+from app.core.pagination import count_capped, paginate
+from app.core.jobs import enqueue, job_accepted
+from app.core.project_jobs import reassign_tasks
+from app.core.project_stats import project_stats
 from app.schemas.project import (
     ProjectCreate, ProjectRead, ProjectUpdate,
-    ProjectMemberCreate, ProjectMemberUpdate, ProjectMemberRead,
+    ProjectMemberCreate, ProjectMemberUpdate, ProjectMemberRead, ProjectMemberPage, ProjectMembers,
+    ProjectStats,
+    ProjectTaskReassign,
+    ProjectDashboardItem,
 )
+from app.schemas.task import TaskRead
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -22,9 +42,11 @@ router = APIRouter(prefix="/projects", tags=["projects"])
     summary="プロジェクトから脱退（自分自身）",
     description="認証済みユーザーが、指定されたプロジェクトから脱退します。ADMINロールのメンバーは脱退できません。",
 )
+@async_endpoint
+@retry_on_busy
 def leave_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     #プロジェクトの存在確認
@@ -58,44 +80,41 @@ def leave_project(
             detail="ADMINロールのメンバーは脱退できません。別のメンバーにADMIN権限を移譲してから脱退してください。",
         )
 
-    #自分の ProjectMember レコードを検索
-    member_record = (
-        db.query(ProjectMember)
-        .filter(
-            ProjectMember.user_id == current_user.id,
-            ProjectMember.project_id == project_id
-        )
-        .first()
-    )
+    #担当タスクをプロジェクト作成者に付け替える（最終更新者は自分）
+    reassigned_ids = _reassign_member_tasks(db, project, current_user.id, current_user.id)
 
-    if not member_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="このプロジェクトに参加していません。",
-        )
-        
-    #担当タスクをプロジェクト作成者に付け替える (remove_memberのロジックを踏襲)
-    tasks_to_reassign = (
-        db.query(Task)
-        .filter(Task.project_id == project_id, Task.assignee_id == current_user.id)
-        .all()
-    )
-    
-    for task in tasks_to_reassign:
-        # 担当者をプロジェクト作成者（creator_id）に変更
-        task.assignee_id = project.creator_id
-        task.updated_by = current_user.id # 最終更新者を自分にする
-        db.add(task)
-        # 注: 担当者変更の履歴 (TaskHistory) 記録はここでは省略します。
-
-    #メンバーシップレコードを削除
+    #メンバーシップレコードを削除（付け替えと同じトランザクションでコミット）
+    leaving_user_id = member_record.user_id
+    leaving_member_id = member_record.id
     db.delete(member_record)
     db.commit()
+    invalidate_project_roles(db, project_id, leaving_user_id)
+    _publish_member_removed(db, project_id, leaving_member_id, leaving_user_id, reassigned_ids)
 
     #成功時には 204 No Content を返す
     return None
 
 
+def _reassign_member_tasks(db: Session, project: Project, user_id: int, acting_user_id: int) -> list[int]:
+    """user_id が担当のタスクをプロジェクト作成者に付け替え、付け替えた id を返す（コミットは呼び出し側）。"""
+    return reassign_tasks(db, project.id, user_id, project.creator_id, acting_user_id)
+
+
+def _publish_member_removed(db: Session, project_id: int, member_id: int, user_id: int, reassigned_ids: list[int]) -> None:
+    """脱退・削除の通知。付け替えたタスクも通知し、外れたユーザーの購読は終了させる。"""
+    if not hub.has_subscribers(project_id):
+        return
+    hub.publish(project_id, "members.removed", member_id=member_id, user_id=user_id)
+    if reassigned_ids:
+        tasks = db.query(Task).filter(Task.id.in_(reassigned_ids)).all()
+        hub.publish(
+            project_id,
+            "tasks.updated",
+            tasks=[TaskRead.model_validate(task, from_attributes=True) for task in tasks],
+        )
+    hub.close_user(project_id, user_id)
+
+
 def project_to_read(project: Project):
     return {
         "id": project.id,
@@ -108,17 +127,63 @@ def project_to_read(project: Project):
     }
 
 
+def _project_etag(project: Project) -> str:
+    # 作成者名は変更できないので、プロジェクト行の更新日時だけで表現が決まる
+    return make_etag("project", project.id, project.updated_at)
+
+
+def _members_etag(db: Session, project_id: int, role: str | None = None) -> str:
+    """メンバー一覧の ETag。件数と最終更新日時（招待・ロール変更・アイコン変更で更新される）から作る。
+    削除は件数の変化で検知する。"""
+    count, last_updated = (
+        db.query(func.count(ProjectMember.id), func.max(ProjectMember.updated_at))
+        .filter(ProjectMember.project_id == project_id)
+        .one()
+    )
+    return make_etag("members", project_id, count, last_updated, role)
+
+
+def _member_query(db: Session):
+    """ユーザー名・アイコンを同じ SELECT の JOIN で読み込むメンバーのクエリ（メンバーごとの遅延ロードを起こさない）。"""
+    return (
+        db.query(ProjectMember)
+        .outerjoin(ProjectMember.user)
+        .options(contains_eager(ProjectMember.user).load_only(User.username, User.icon))
+    )
+
+
+def _member_to_read(member: ProjectMember, user: User | None = None) -> ProjectMemberRead:
+    # user を渡さなければ読み込み済みの member.user を使う
+    user = user or member.user
+    return ProjectMemberRead(
+        id=member.id,
+        project_id=member.project_id,
+        user_id=member.user_id,
+        role=member.role,
+        invited_at=member.invited_at,
+        username=user.username if user else "Unknown",
+        icon=user.icon if user else None,
+    )
+
+
+def _check_role_filter(role: str | None) -> None:
+    if role is not None and role not in (ROLE_ADMIN, ROLE_VIEWER):
+        raise HTTPException(status_code=400, detail="無効なロールです")
+
+
 @router.post("/", response_model=ProjectRead)
+@async_endpoint
+@retry_on_busy
 def create_project(
     payload: ProjectCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     # プロジェクト作成。作成者をOWNER/ADMIN相当としてメンバーに登録。
     project = Project(name=payload.name, description=payload.description, creator_id=current_user.id)
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    # id の採番だけ先に行う（commit は1回にして、リトライ時にプロジェクトが二重に作られないようにする）
+    db.flush()
 
     # 作成者をADMINでメンバー登録
     member = ProjectMember(project_id=project.id, user_id=current_user.id, role=ROLE_ADMIN)
@@ -126,15 +191,21 @@ def create_project(
     db.commit()
 
     db.refresh(project)
+    # 削除済みプロジェクトのIDが再利用された場合に備えて破棄
+    invalidate_project_roles(db, project.id)
     return project_to_read(project)
 
 
 @router.patch("/{project_id}", response_model=ProjectRead)
+@async_endpoint
+@retry_on_busy
 def update_project(
     project_id: int,
     payload: ProjectUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -143,6 +214,7 @@ def update_project(
     # 変更は所有者またはADMINに限定
     if not (project.creator_id == current_user.id or role == ROLE_ADMIN):
         raise HTTPException(status_code=403, detail="権限がありません")
+    check_if_match(request, _project_etag(project))
 
     if payload.name is not None:
         project.name = payload.name
@@ -152,15 +224,23 @@ def update_project(
     db.add(project)
     db.commit()
     db.refresh(project)
-    return project_to_read(project)
+    set_etag(response, _project_etag(project))
+    result = project_to_read(project)
+    hub.publish(project_id, "project.updated", project=result)
+    return result
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+@async_endpoint
+@retry_on_busy
 def delete_project(
     project_id: int,
+    background: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
+    """プロジェクトの削除。background=true ならジョブとして少しずつ削除し、202 とジョブを返す
+    （タスクが多いプロジェクト向け。進捗は GET /jobs/{job_id}）。"""
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
@@ -168,32 +248,254 @@ def delete_project(
     if not (project.creator_id == current_user.id or role == ROLE_ADMIN):
         raise HTTPException(status_code=403, detail="権限がありません")
 
-    # メンバーとタスクはモデル側のリレーションでcascade delete設定済み想定
+    if background:
+        return job_accepted(enqueue(db, "project.delete", current_user.id, project_id=project_id))
+
+    # メンバーとタスク（と履歴）は DB の ON DELETE CASCADE で消える
     db.delete(project)
     db.commit()
+    invalidate_project_roles(db, project_id)
+    hub.publish(project_id, "project.deleted")
+    hub.close_project(project_id)
     return None
 
 
+@router.post("/{project_id}/reassign", status_code=status.HTTP_202_ACCEPTED)
+@async_endpoint
+def reassign_project_tasks(
+    project_id: int,
+    payload: ProjectTaskReassign,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """プロジェクト内で from_user_id が担当のタスクをすべて to_user_id に付け替える（ADMIN のみ）。
+    件数が多くてもよいようジョブとして実行し、202 とジョブを返す。"""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
+    if user_project_role(db, current_user.id, project_id) != ROLE_ADMIN:
+        raise HTTPException(status_code=403, detail="担当者の一括変更はADMINのみ許可されています")
+    to_user_id = payload.to_user_id
+    if to_user_id == payload.from_user_id:
+        raise HTTPException(status_code=400, detail="付け替え先が付け替え元と同じです")
+    if to_user_id != project.creator_id and user_project_role(db, to_user_id, project_id) is None:
+        raise HTTPException(status_code=400, detail="付け替え先はプロジェクトのメンバーにしてください")
+
+    job = enqueue(db, "project.reassign", current_user.id, params=payload, project_id=project_id)
+    return job_accepted(job)
+
+
+@router.post("/{project_id}/export", status_code=status.HTTP_202_ACCEPTED)
+@async_endpoint
+def export_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """プロジェクト・メンバー・タスクの書き出し（閲覧権限があれば可）。
+    ジョブとして実行し、202 とジョブを返す。完了すると GET /jobs/{job_id} の result に入る。"""
+    _check_project_viewable(db, current_user, project_id)
+    return job_accepted(enqueue(db, "project.export", current_user.id, project_id=project_id))
+
+
+def _my_projects_filter(user_id: int):
+    """自分が所有 or メンバーのプロジェクト。"""
+    joined = select(ProjectMember.project_id).where(ProjectMember.user_id == user_id)
+    return or_(Project.creator_id == user_id, Project.id.in_(joined))
+
+
 @router.get("/", response_model=list[ProjectRead])
+@async_endpoint
 def list_my_projects(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    # 自分が所有 or メンバーのプロジェクト一覧
-    owned = db.query(Project).filter(Project.creator_id == current_user.id)
-    joined_ids = [pm.project_id for pm in db.query(ProjectMember).filter(ProjectMember.user_id == current_user.id).all()]
-    joined = db.query(Project).filter(Project.id.in_(joined_ids)) if joined_ids else []
-    results = list(owned.all()) + (list(joined) if isinstance(joined, list) else list(joined.all()))
-    # 重複排除
-    uniq = {p.id: p for p in results}
-    return [project_to_read(p) for p in uniq.values()]
+    # 自分が所有 or メンバーのプロジェクト一覧（作成者名も JOIN で同時に取得）
+    projects = (
+        db.query(Project)
+        .options(joinedload(Project.creator))
+        .filter(_my_projects_filter(current_user.id))
+        .order_by(Project.id)
+        .all()
+    )
+    return [project_to_read(p) for p in projects]
+
+
+# ダッシュボードでプロジェクトごとに返す「自分が担当の未完了タスク」の件数
+DASHBOARD_TASKS_PER_PROJECT = 20
+
+
+@router.get("/dashboard", response_model=list[ProjectDashboardItem])
+@async_endpoint
+def get_dashboard(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """自分が所有または参加しているプロジェクトの一覧画面用データをまとめて返す。
+    ロール・メンバー数・ステータス別タスク数・自分が担当の未完了タスクを含む。
+    クエリはプロジェクト数によらず4回（プロジェクト+ロール、メンバー数、タスク集計、担当タスク）。"""
+    me = current_user.id
+    rows = (
+        db.query(Project, ProjectMember.role)
+        .options(joinedload(Project.creator))
+        .outerjoin(
+            ProjectMember,
+            (ProjectMember.project_id == Project.id) & (ProjectMember.user_id == me),
+        )
+        .filter(_my_projects_filter(me))
+        .order_by(Project.id)
+        .all()
+    )
+    if not rows:
+        return []
+    items = {}
+    for project, role in rows:
+        item = project_to_read(project)
+        item.update(
+            role=role,
+            is_owner=project.creator_id == me,
+            member_count=0,
+            task_total=0,
+            task_counts={},
+            my_open_task_count=0,
+            my_open_tasks=[],
+        )
+        items[project.id] = item
+    project_ids = list(items)
+
+    member_counts = (
+        db.query(ProjectMember.project_id, func.count(ProjectMember.id))
+        .filter(ProjectMember.project_id.in_(project_ids))
+        .group_by(ProjectMember.project_id)
+    )
+    for project_id, count in member_counts:
+        items[project_id]["member_count"] = count
+
+    # ステータス別の件数と、そのうち自分が担当のものを同じ GROUP BY で数える
+    mine = case((Task.assignee_id == me, 1), else_=0)
+    task_counts = (
+        db.query(Task.project_id, Task.status, mine, func.count(Task.id))
+        .filter(Task.project_id.in_(project_ids))
+        .group_by(Task.project_id, Task.status, mine)
+    )
+    for project_id, task_status, is_mine, count in task_counts:
+        item = items[project_id]
+        item["task_total"] += count
+        item["task_counts"][task_status] = item["task_counts"].get(task_status, 0) + count
+        if is_mine and task_status != "completed":
+            item["my_open_task_count"] += count
+
+    # 自分が担当の未完了タスクを、プロジェクトごとに期限の近い順で上位 N 件（ウィンドウ関数で1回）
+    rank = func.row_number().over(
+        partition_by=Task.project_id,
+        order_by=(Task.deadline.is_(None), Task.deadline, Task.id),
+    ).label("rank")
+    ranked = (
+        select(Task.id, rank)
+        .where(Task.project_id.in_(project_ids), Task.assignee_id == me, Task.status != "completed")
+        .subquery()
+    )
+    open_tasks = (
+        db.query(Task)
+        .join(ranked, ranked.c.id == Task.id)
+        .filter(ranked.c.rank <= DASHBOARD_TASKS_PER_PROJECT)
+        .order_by(Task.project_id, ranked.c.rank)
+    )
+    for task in open_tasks:
+        items[task.project_id]["my_open_tasks"].append(TaskRead.model_validate(task, from_attributes=True))
+
+    return list(items.values())
+
+
+# 複数プロジェクトの集計で一度に指定できるプロジェクト数の上限
+PROJECT_STATS_MAX = 200
+# メンバー一覧を一度に取得できるプロジェクト数・1ページの件数の上限
+PROJECT_MEMBERS_BULK_MAX = 200
+PROJECT_MEMBERS_PAGE_MAX = 200
+
+
+def _check_projects_viewable(db: Session, current_user: CurrentUser, project_ids) -> None:
+    """project_ids のすべてを閲覧できるか（所有者または VIEWER 以上）をまとめて確認する。"""
+    creators = dict(db.query(Project.id, Project.creator_id).filter(Project.id.in_(project_ids)).all())
+    if set(project_ids) - creators.keys():
+        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
+    prime_project_roles(db, current_user.id, project_ids)
+    for project_id in project_ids:
+        role = user_project_role(db, current_user.id, project_id)
+        if not (creators[project_id] == current_user.id or role in (ROLE_ADMIN, ROLE_VIEWER)):
+            raise HTTPException(status_code=403, detail="閲覧権限がありません")
+
+
+@router.get("/stats", response_model=list[ProjectStats])
+@async_endpoint
+def get_projects_stats(
+    project_ids: list[int] | None = Query(None),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """複数プロジェクトのタスク集計（?project_ids=1&project_ids=2）。
+    省略すると自分が所有または参加しているプロジェクトすべて。クエリ数はプロジェクト数によらず一定。"""
+    if project_ids is None:
+        joined = select(ProjectMember.project_id).where(ProjectMember.user_id == current_user.id)
+        project_ids = [
+            pid for (pid,) in db.query(Project.id)
+            .filter(or_(Project.creator_id == current_user.id, Project.id.in_(joined)))
+            .order_by(Project.id)
+        ]
+    else:
+        project_ids = list(dict.fromkeys(project_ids))
+        if len(project_ids) > PROJECT_STATS_MAX:
+            raise HTTPException(status_code=400, detail=f"一度に集計できるプロジェクトは{PROJECT_STATS_MAX}件までです")
+        if project_ids:
+            _check_projects_viewable(db, current_user, project_ids)
+    return list(project_stats(db, project_ids).values())
+
+
+@router.get("/members", response_model=list[ProjectMembers])
+@async_endpoint
+def list_projects_members(
+    project_ids: list[int] = Query(...),
+    role: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """複数プロジェクトのメンバー一覧（?project_ids=1&project_ids=2）。指定した順に返す。
+    クエリ数はプロジェクト数・メンバー数によらず一定（権限確認2回とメンバー1回）。"""
+    _check_role_filter(role)
+    project_ids = list(dict.fromkeys(project_ids))
+    if len(project_ids) > PROJECT_MEMBERS_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"一度に取得できるプロジェクトは{PROJECT_MEMBERS_BULK_MAX}件までです")
+    _check_projects_viewable(db, current_user, project_ids)
+
+    members = {project_id: [] for project_id in project_ids}
+    q = _member_query(db).filter(ProjectMember.project_id.in_(project_ids))
+    if role is not None:
+        q = q.filter(ProjectMember.role == role)
+    for member in q.order_by(ProjectMember.project_id, ProjectMember.id):
+        members[member.project_id].append(_member_to_read(member))
+    return [ProjectMembers(project_id=pid, members=items) for pid, items in members.items()]
+
+
+@router.get("/{project_id}/stats", response_model=ProjectStats)
+@async_endpoint
+def get_project_stats(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """プロジェクトのタスク集計（ステータス別・優先度別・担当者別の件数、期限切れ件数、親/子タスク数、完了率）。"""
+    _check_projects_viewable(db, current_user, [project_id])
+    return project_stats(db, [project_id])[project_id]
 
 
 @router.get("/{project_id}", response_model=ProjectRead)
+@async_endpoint
 def get_project(
     project_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -202,15 +504,21 @@ def get_project(
     # 閲覧は VIEWER 以上許可（JOIN 済み想定）。所有者も可。
     if not (project.creator_id == current_user.id or role in (ROLE_ADMIN, ROLE_VIEWER)):
         raise HTTPException(status_code=403, detail="閲覧権限がありません")
+    etag = _project_etag(project)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return project_to_read(project)
 
 
 @router.post("/{project_id}/members/invite", response_model=ProjectMemberRead)
+@async_endpoint
+@retry_on_busy
 def invite_member(
     project_id: int,
     payload: ProjectMemberCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -244,53 +552,84 @@ def invite_member(
     db.add(member)
     db.commit()
     db.refresh(member)
-    # レスポンスに username を含める
-    return {
-        "id": member.id,
-        "project_id": member.project_id,
-        "user_id": member.user_id,
-        "role": member.role,
-        "invited_at": member.invited_at,
-        "username": target_user.username,
-    }
+    invalidate_project_roles(db, project_id, member.user_id)
+    # レスポンスに username を含める（招待したユーザーは読み込み済み）
+    result = _member_to_read(member, target_user)
+    hub.publish(project_id, "members.added", member=result)
+    return result
+
+
+def _check_project_viewable(db: Session, current_user: CurrentUser, project_id: int) -> None:
+    project = db.query(Project.creator_id).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
+    role = user_project_role(db, current_user.id, project_id)
+    if not (project.creator_id == current_user.id or role in (ROLE_ADMIN, ROLE_VIEWER)):
+        raise HTTPException(status_code=403, detail="閲覧権限がありません")
 
 
 @router.get("/{project_id}/members", response_model=list[ProjectMemberRead])
+@async_endpoint
 def list_members(
     project_id: int,
+    request: Request,
+    response: Response,
+    role: str | None = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
-    role = user_project_role(db, current_user.id, project.id)
-    if not (project.creator_id == current_user.id or role in (ROLE_ADMIN, ROLE_VIEWER)):
-        raise HTTPException(status_code=403, detail="閲覧権限がありません")
-    
-    members = db.query(ProjectMember).filter(ProjectMember.project_id == project_id).all()
-    # usernameを含めるために追加情報を付与
-    result = []
-    for member in members:
-        member_dict = {
-            "id": member.id,
-            "project_id": member.project_id,
-            "user_id": member.user_id,
-            "role": member.role,
-            "invited_at": member.invited_at,
-            "username": member.user.username if member.user else "Unknown"
-        }
-        result.append(member_dict)
-    return result
+    """メンバー一覧（全件、招待順）。role で ADMIN / VIEWER に絞り込める。
+    メンバー数が多い場合は /{project_id}/members/page を使う。"""
+    _check_role_filter(role)
+    _check_project_viewable(db, current_user, project_id)
+
+    # 変更がなければメンバー行を読まずに 304
+    etag = _members_etag(db, project_id, role)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    q = _member_query(db).filter(ProjectMember.project_id == project_id)
+    if role is not None:
+        q = q.filter(ProjectMember.role == role)
+    return [_member_to_read(member) for member in q.order_by(ProjectMember.id)]
+
+
+@router.get("/{project_id}/members/page", response_model=ProjectMemberPage)
+@async_endpoint
+def list_members_page(
+    project_id: int,
+    role: str | None = None,
+    limit: int = Query(50, ge=1, le=PROJECT_MEMBERS_PAGE_MAX),
+    cursor: str | None = None,
+    with_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """メンバー一覧（カーソル方式、招待順）。次のページはレスポンスの next_cursor を cursor に渡す。"""
+    _check_role_filter(role)
+    _check_project_viewable(db, current_user, project_id)
+
+    q = _member_query(db).filter(ProjectMember.project_id == project_id)
+    if role is not None:
+        q = q.filter(ProjectMember.role == role)
+    items, next_cursor = paginate(q, (ProjectMember.id,), limit, cursor, descending=False)
+    page = ProjectMemberPage(items=[_member_to_read(member) for member in items], next_cursor=next_cursor)
+    if with_total:
+        page.total, page.total_is_exact = count_capped(db, q)
+    return page
 
 
 @router.patch("/{project_id}/members/{member_id}", response_model=ProjectMemberRead)
+@async_endpoint
+@retry_on_busy
 def change_member_role(
     project_id: int,
     member_id: int,
     payload: ProjectMemberUpdate,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -300,53 +639,56 @@ def change_member_role(
     if role != ROLE_ADMIN:
         raise HTTPException(status_code=403, detail="ロール変更はADMINのみ許可されています")
 
-    member = db.query(ProjectMember).filter(ProjectMember.id == member_id, ProjectMember.project_id == project_id).first()
+    member = (
+        _member_query(db)
+        .filter(ProjectMember.id == member_id, ProjectMember.project_id == project_id)
+        .first()
+    )
     if not member:
         raise HTTPException(status_code=404, detail="メンバーが見つかりません")
+    # If-Match にはメンバー一覧（GET /{project_id}/members）の ETag を指定する
+    check_if_match(request, lambda: _members_etag(db, project_id))
 
     # プロジェクト作成者のロールは常にADMINに固定
     if member.user_id == project.creator_id:
         if payload.role != ROLE_ADMIN:
             raise HTTPException(status_code=400, detail="プロジェクト作成者のロールは変更できません")
         member.role = ROLE_ADMIN
+        user = member.user
         db.add(member)
         db.commit()
         db.refresh(member)
-        return {
-            "id": member.id,
-            "project_id": member.project_id,
-            "user_id": member.user_id,
-            "role": member.role,
-            "invited_at": member.invited_at,
-            "username": member.user.username if member.user else "Unknown",
-        }
+        invalidate_project_roles(db, project_id, member.user_id)
+        result = _member_to_read(member, user)
+        hub.publish(project_id, "members.updated", member=result)
+        return result
 
     # ロール値検証（将来 Enum 化で厳密化予定）
     if payload.role not in (ROLE_ADMIN, ROLE_VIEWER):
         raise HTTPException(status_code=400, detail="無効なロールです")
     
     member.role = payload.role
+    # commit で期限切れになる前に、JOIN で読み込んだユーザーを控えておく
+    user = member.user
     db.add(member)
     db.commit()
     db.refresh(member)
+    invalidate_project_roles(db, project_id, member.user_id)
 
     # ProjectMemberRead で要求される username を含めて返却
-    return {
-        "id": member.id,
-        "project_id": member.project_id,
-        "user_id": member.user_id,
-        "role": member.role,
-        "invited_at": member.invited_at,
-        "username": member.user.username if member.user else "Unknown",
-    }
+    result = _member_to_read(member, user)
+    hub.publish(project_id, "members.updated", member=result)
+    return result
 
 
 @router.delete("/{project_id}/members/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
+@async_endpoint
+@retry_on_busy
 def remove_member(
     project_id: int,
     member_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -364,17 +706,79 @@ def remove_member(
     if member.user_id == project.creator_id:
         raise HTTPException(status_code=400, detail="プロジェクト作成者は削除できません")
 
-    # 担当タスクをプロジェクト作成者に付け替える
-    tasks = (
-        db.query(Task)
-        .filter(Task.project_id == project_id, Task.assignee_id == member.user_id)
-        .all()
-    )
-    for task in tasks:
-        task.assignee_id = project.creator_id
-        task.updated_by = current_user.id
-        db.add(task)
-
+    # 担当タスクをプロジェクト作成者に付け替え、メンバー削除と同じトランザクションでコミットする
+    removed_user_id = member.user_id
+    reassigned_ids = _reassign_member_tasks(db, project, removed_user_id, current_user.id)
     db.delete(member)
     db.commit()
+    invalidate_project_roles(db, project_id, removed_user_id)
+    _publish_member_removed(db, project_id, member_id, removed_user_id, reassigned_ids)
     return None
+
+
+def _authorize_subscription(db: Session, token: str | None, project_id: int) -> CurrentUser:
+    """購読の可否。閲覧権限は GET /{project_id} と同じ（所有者または VIEWER 以上）。"""
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user = authenticate_token(db, token)
+    project = db.query(Project.creator_id).filter(Project.id == project_id).first()
+    if project is None:
+        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
+    role = user_project_role(db, user.id, project_id)
+    if not (project.creator_id == user.id or role in (ROLE_ADMIN, ROLE_VIEWER)):
+        raise HTTPException(status_code=403, detail="閲覧権限がありません")
+    return user
+
+
+async def _watch_disconnect(websocket: WebSocket, subscriber) -> None:
+    # クライアントからの切断を受け取ったら送信ループを終わらせる（受信内容は使わない）
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscriber.offer(CLOSE)
+
+
+@router.websocket("/{project_id}/events")
+async def project_events(websocket: WebSocket, project_id: int, token: str | None = None):
+    """プロジェクトのタスク・メンバーの変更をリアルタイムに受け取る WebSocket。
+    認証は ?token=<JWT>（ブラウザの WebSocket はヘッダーを付けられないため）か Authorization ヘッダー。
+    サーバーから JSON で {"type": ..., "project_id": ..., ...} を送る。
+    - tasks.created / tasks.updated: tasks（TaskRead の配列）
+    - tasks.deleted: task_ids
+    - members.added / members.updated: member（ProjectMemberRead）、members.removed: member_id, user_id
+    - project.updated: project、project.deleted
+    - resync: 受信が追いつかず通知を捨てたので、GET /tasks/projects/{id}/changes 等で取り直すこと
+    - ping: 接続維持
+    メンバーから外れた場合やプロジェクトが削除された場合はサーバーから切断する。
+    """
+    if token is None:
+        authorization = websocket.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    try:
+        user = await run_in_new_session(_authorize_subscription, token, project_id)
+    except HTTPException as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail))
+        return
+
+    await websocket.accept()
+    subscriber = hub.subscribe(project_id, user.id)
+    watcher = asyncio.create_task(_watch_disconnect(websocket, subscriber))
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), REALTIME_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                message = PING
+            if message is CLOSE:
+                break
+            # 送れない（遅すぎる・切れている）接続は切る
+            await asyncio.wait_for(websocket.send_text(message), REALTIME_SEND_TIMEOUT)
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError, OSError):
+        pass
+    finally:
+        hub.unsubscribe(subscriber)
+        watcher.cancel()
+        with suppress(Exception):
+            await websocket.close()
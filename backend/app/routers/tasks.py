@@ -1,12 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import Integer, func, insert, literal, select, update
+from sqlalchemy.orm import Session, contains_eager
 
-from app.core.auth import get_current_user
-from app.core.permissions import can_view_task, can_modify_task, can_change_status
-from app.database.session import get_db
+from app.core.auth import CurrentUser, get_current_user
+from app.core.permissions import (
+    can_view_task,
+    can_modify_task,
+    can_change_status,
+    visible_tasks_clause,
+    prime_project_roles,
+    user_project_role,
+)
+from app.core.etag import check_if_match, is_not_modified, make_etag, not_modified, set_etag
+from app.core.realtime import hub
+from app.core.pagination import count_capped, decode_cursor, encode_cursor, paginate
+from app.core.search import search_tasks, task_search_filter
+from app.core.task_tree import (
+    ancestor_ids,
+    child_depth,
+    child_path,
+    descendants_filter,
+    move_subtree,
+    would_create_cycle,
+)
+from app.database.session import get_db, retry_on_busy, async_endpoint
 from app.models.task import Task
 from app.models.user import User
 from app.models.task_history import TaskHistory
+from app.models.task_change import TaskChange
 from app.models.project import Project
 from app.models.project_member import ProjectMember
 from app.schemas.task import (
@@ -17,6 +38,15 @@ from app.schemas.task import (
     TaskPriorityUpdate,
     TaskUpdate,
     TaskWithProjectRead,
+    TaskWithProjectPage,
+    TaskTreeNode,
+    TaskBulkCreate,
+    TaskBulkCreatedRead,
+    TaskBulkUpdate,
+    TaskBulkUpdateResult,
+    TaskPage,
+    TaskSearchHit,
+    TaskChanges,
 )
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -24,12 +54,118 @@ from zoneinfo import ZoneInfo
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# 一括作成・一括更新（task_ids 指定）で1リクエストに含められるタスク数の上限
+TASK_BULK_MAX = 1000
+# ツリー取得の最大階層（max_depth 未指定時、および親子が循環している場合の打ち切り）
+TASK_TREE_MAX_DEPTH = 50
+# カーソル方式の一覧で1ページに返せる件数の上限
+TASK_PAGE_MAX = 200
+# 差分同期で1回に返す変更件数の上限
+TASK_CHANGES_MAX = 1000
+# IN 句1回あたりの件数（SQLite のバインド変数上限を超えないように分割する）
+_IN_CHUNK = 500
+
+
+def _project_task_filters(
+    db: Session,
+    project_id: int,
+    status: str | None = None,
+    assignee_id: int | None = None,
+    priority: int | None = None,
+    parent_id: int | None = None,
+    search: str | None = None,
+) -> list:
+    """タスク一覧の絞り込み条件。一覧と一括更新の filter 指定で共用する。"""
+    filters = [Task.project_id == project_id]
+    if parent_id is not None:
+        filters.append(Task.parent_id == parent_id)
+    if status is not None:
+        filters.append(Task.status == status)
+    if assignee_id is not None:
+        filters.append(Task.assignee_id == assignee_id)
+    if priority is not None:
+        filters.append(Task.priority == priority)
+    if search:
+        # タイトル・説明の全文検索（索引がなければ部分一致）。空白区切りの語はすべて含むもの。
+        clause = task_search_filter(db, search)
+        if clause is not None:
+            filters.append(clause)
+    return filters
+
+
+def _jst_naive(value: datetime | None) -> datetime | None:
+    # DateTime 列はタイムゾーンなし（JST）で保存する。保存・比較する値もそろえる
+    # （SQLite はタイムゾーンを捨てて時刻だけを保存するので、+09:00 以外で来た値がずれないように）
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(ZoneInfo("Asia/Tokyo")).replace(tzinfo=None)
+
+
+def _to_task_read(task: Task, schema: type[TaskRead] = TaskRead) -> TaskRead:
+    """commit 前のタスクをレスポンス用に確定する（commit 後の再SELECTを避けるため）。"""
+    result = schema.model_validate(task, from_attributes=True)
+    # 再読込した場合と同じく、タイムゾーンなしの JST にそろえる
+    for field in ("deadline", "created_at", "updated_at"):
+        setattr(result, field, _jst_naive(getattr(result, field)))
+    return result
+
+
+def _insert_tasks_returning(db: Session, rows: list[dict]) -> list[Task]:
+    """複数行 INSERT ... RETURNING で作成し、rows と同じ順序の Task を返す。"""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite では sort_by_parameter_order を指定すると1行ずつの INSERT に退化する。
+        # 同一トランザクション内の採番は VALUES の順に増えるので、id 順に並べて対応づける。
+        tasks = db.scalars(insert(Task).returning(Task), rows).all()
+        return sorted(tasks, key=lambda task: task.id)
+    return db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows).all()
+
+
+def _task_etag(task: Task | TaskRead) -> str:
+    # 内容が変わる更新では必ず updated_at も変わる
+    return make_etag("task", task.id, task.updated_at)
+
+
+def _task_list_etag(db: Session, request: Request, user_id: int, project_id: int) -> str:
+    """プロジェクトのタスク一覧の ETag。タスク件数と最終更新日時から作る（行は読まない）。
+    見えるタスクはユーザーとロール、内容は絞り込み条件によって変わるので、それらも含める。"""
+    count, last_updated = (
+        db.query(func.count(Task.id), func.max(Task.updated_at))
+        .filter(Task.project_id == project_id)
+        .one()
+    )
+    role = user_project_role(db, user_id, project_id)
+    params = sorted(request.query_params.multi_items())
+    return make_etag("tasks", project_id, count, last_updated, user_id, role, params, request.url.path)
+
+
+def _commit_task(
+    db: Session,
+    task: Task,
+    user_id: int,
+    action_type: str | None,
+    changes: str | None = None,
+) -> TaskRead:
+    """タスクの変更と履歴行を1トランザクションで書き込む。
+    INSERT の id は flush 時に RETURNING（非対応DBでは lastrowid）で受け取り、
+    更新日時などはアプリ側で決まるので、commit 後に refresh（再SELECT）せず
+    flush 時点の値を TaskRead に写して返す。action_type=None なら履歴は残さない。"""
+    db.add(task)
+    if action_type is not None:
+        # task= で紐づけると、新規タスクでも同じ flush 内で task_id が埋まる
+        db.add(TaskHistory(task=task, user_id=user_id, action_type=action_type, changes=changes))
+    db.flush()
+    result = _to_task_read(task)
+    db.commit()
+    return result
+
 
 @router.post("/", response_model=TaskRead)
+@async_endpoint
+@retry_on_busy
 def create_task(
     task_in: TaskCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     # すべてのタスクはプロジェクト配下。メンバーのみ作成可能。
     from app.core.permissions import user_project_role
@@ -52,12 +188,20 @@ def create_task(
         if other_members == 0:
             auto_assignee_id = project.creator_id
 
+    parent = None
+    if task_in.parent_id is not None:
+        parent = db.query(Task).filter(Task.id == task_in.parent_id).first()
+        if parent is None or parent.project_id != task_in.project_id:
+            raise HTTPException(status_code=400, detail="親タスクが同じプロジェクト内に見つかりません")
+
     task = Task(
         title=task_in.title,
         description=task_in.description,
-        deadline=task_in.deadline,
+        deadline=_jst_naive(task_in.deadline),
         project_id=task_in.project_id,
         parent_id=task_in.parent_id,
+        path=child_path(parent),
+        depth=child_depth(parent),
         status=task_in.status or "not_started",
         priority=task_in.priority or 0,
         assignee_id=auto_assignee_id,
@@ -65,24 +209,14 @@ def create_task(
         updated_by=current_user.id,
     )
 
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-
-    # 履歴記録（CREATE）
-    history = TaskHistory(
-        task_id=task.id,
-        user_id=current_user.id,
-        action_type="CREATE",
-        changes=f"title={task.title}"
-    )
-    db.add(history)
-    db.commit()
+    # タスク本体と履歴記録（CREATE）を同時に書き込む
+    created = _commit_task(db, task, current_user.id, "CREATE", f"title={task.title}")
+    hub.publish(created.project_id, "tasks.created", tasks=[created])
 
     now = datetime.now(ZoneInfo("Asia/Tokyo"))
-    if task.deadline:
+    if created.deadline:
         # deadlineにJST情報を付与して比較可能にする
-        deadline_aware = task.deadline.replace(tzinfo=ZoneInfo("Asia/Tokyo"))
+        deadline_aware = created.deadline.replace(tzinfo=ZoneInfo("Asia/Tokyo"))
         # 期限が現在より前なら揶揄う
         if deadline_aware < now:
             raise HTTPException(
@@ -90,14 +224,259 @@ def create_task(
             detail="計画性がありません"  # ここでふざける
             )
 
-    return task
+    return created
+
+
+@router.post("/bulk", response_model=list[TaskBulkCreatedRead])
+@async_endpoint
+@retry_on_busy
+def create_tasks_bulk(
+    payload: TaskBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """タスクの一括作成（スプリント計画の取り込みなど）。
+    - 権限・プロジェクト・メンバー数の確認はプロジェクト単位でまとめて1回ずつ。
+    - parent_client_id で同じリクエスト内のタスクを親に指定できる。
+      親が確定した階層ごとにまとめて INSERT（RETURNING で id を受け取る）する。
+    - すべてのタスクと CREATE 履歴を1トランザクションで書き込む。結果は入力と同じ順序。
+    """
+    items = payload.tasks
+    if not items:
+        return []
+    if len(items) > TASK_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"一度に作成できるタスクは{TASK_BULK_MAX}件までです")
+
+    # クライアント側一時IDの検証
+    by_client_id = {}
+    for item in items:
+        if item.client_id is None:
+            continue
+        if item.client_id in by_client_id:
+            raise HTTPException(status_code=400, detail=f"client_id が重複しています: {item.client_id}")
+        by_client_id[item.client_id] = item
+    for item in items:
+        if item.parent_client_id is None:
+            continue
+        if item.parent_id is not None:
+            raise HTTPException(status_code=400, detail="parent_id と parent_client_id は同時に指定できません")
+        parent = by_client_id.get(item.parent_client_id)
+        if parent is None:
+            raise HTTPException(status_code=400, detail=f"parent_client_id に対応するタスクがありません: {item.parent_client_id}")
+        if parent.project_id != item.project_id:
+            raise HTTPException(status_code=400, detail="親タスクと同じプロジェクトを指定してください")
+
+    # すべてのタスクはプロジェクト配下。メンバーのみ作成可能（プロジェクトごとに1回だけ確認）。
+    project_ids = {item.project_id for item in items}
+    prime_project_roles(db, current_user.id, project_ids)
+    if any(user_project_role(db, current_user.id, project_id) is None for project_id in project_ids):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="プロジェクトメンバーのみタスク作成可能です")
+
+    projects = {p.id: p for p in db.query(Project).filter(Project.id.in_(project_ids))}
+    if project_ids - projects.keys():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="プロジェクトが見つかりません")
+
+    # 作成者以外のメンバー数（0 のプロジェクトでは担当者を作成者に自動設定）
+    other_member_counts = dict(
+        db.query(ProjectMember.project_id, func.count(ProjectMember.id))
+        .join(Project, Project.id == ProjectMember.project_id)
+        .filter(ProjectMember.project_id.in_(project_ids), ProjectMember.user_id != Project.creator_id)
+        .group_by(ProjectMember.project_id)
+        .all()
+    )
+
+    # 既存タスクを親にする場合は同じプロジェクトのタスクであること
+    parent_ids = {item.parent_id for item in items if item.parent_id is not None}
+    existing_parents: dict[int, Task] = {}
+    if parent_ids:
+        existing_parents = {t.id: t for t in db.query(Task).filter(Task.id.in_(parent_ids))}
+        for item in items:
+            parent = existing_parents.get(item.parent_id)
+            if item.parent_id is not None and (parent is None or parent.project_id != item.project_id):
+                raise HTTPException(status_code=400, detail=f"親タスクが同じプロジェクト内に見つかりません: {item.parent_id}")
+
+    created: dict[int, Task] = {}
+    created_by_client: dict[str, Task] = {}
+    pending = list(range(len(items)))
+    while pending:
+        ready = [
+            i for i in pending
+            if items[i].parent_client_id is None or items[i].parent_client_id in created_by_client
+        ]
+        if not ready:
+            raise HTTPException(status_code=400, detail="parent_client_id が循環しています")
+
+        rows = []
+        for i in ready:
+            item = items[i]
+            assignee_id = item.assignee_id
+            if assignee_id is None and other_member_counts.get(item.project_id, 0) == 0:
+                assignee_id = projects[item.project_id].creator_id
+            if item.parent_client_id is not None:
+                parent = created_by_client[item.parent_client_id]
+            else:
+                parent = existing_parents.get(item.parent_id)
+            rows.append({
+                "title": item.title,
+                "description": item.description,
+                "deadline": _jst_naive(item.deadline),
+                "project_id": item.project_id,
+                "parent_id": parent.id if parent is not None else None,
+                "path": child_path(parent),
+                "depth": child_depth(parent),
+                "status": item.status or "not_started",
+                "priority": item.priority or 0,
+                "assignee_id": assignee_id,
+                "created_by": current_user.id,
+                "updated_by": current_user.id,
+            })
+        tasks = _insert_tasks_returning(db, rows)
+        for i, task in zip(ready, tasks):
+            created[i] = task
+            if items[i].client_id is not None:
+                created_by_client[items[i].client_id] = task
+
+        ready_set = set(ready)
+        pending = [i for i in pending if i not in ready_set]
+
+    # 履歴記録（CREATE）は executemany でまとめて
+    db.execute(
+        insert(TaskHistory),
+        [
+            {"task_id": task.id, "user_id": current_user.id, "action_type": "CREATE", "changes": f"title={task.title}"}
+            for task in created.values()
+        ],
+    )
+
+    results = []
+    for i, item in enumerate(items):
+        result = _to_task_read(created[i], TaskBulkCreatedRead)
+        result.client_id = item.client_id
+        results.append(result)
+    db.commit()
+
+    for project_id in project_ids:
+        hub.publish(project_id, "tasks.created", tasks=[r for r in results if r.project_id == project_id])
+    return results
+
+
+@router.patch("/bulk", response_model=TaskBulkUpdateResult)
+@async_endpoint
+@retry_on_busy
+def update_tasks_bulk(
+    payload: TaskBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """ステータス・担当者・優先度の一括変更（スプリント終了、担当替えなど）。
+    - 対象は task_ids、または一覧と同じ条件の filter で指定する。
+    - 権限は個別エンドポイントと同じ（ステータスは can_change_status、
+      担当者・優先度は can_modify_task）。ロールは対象プロジェクト分を1クエリで読み込む。
+    - 許可されたタスクを UPDATE 1文（件数に応じて分割）で更新し、履歴は executemany で書く。
+    - 拒否されたタスクは rejected に理由付きで返す。
+    """
+    set_assignee = "assignee_id" in payload.model_fields_set
+    if payload.status is None and payload.priority is None and not set_assignee:
+        raise HTTPException(status_code=400, detail="変更内容を指定してください")
+    if (payload.task_ids is None) == (payload.filter is None):
+        raise HTTPException(status_code=400, detail="task_ids か filter のどちらか一方を指定してください")
+
+    columns = (Task.id, Task.project_id, Task.created_by, Task.assignee_id, Task.status, Task.priority)
+    rejected = []
+    if payload.task_ids is not None:
+        requested = list(dict.fromkeys(payload.task_ids))
+        if len(requested) > TASK_BULK_MAX:
+            raise HTTPException(status_code=400, detail=f"一度に変更できるタスクは{TASK_BULK_MAX}件までです")
+        rows = []
+        for start in range(0, len(requested), _IN_CHUNK):
+            rows += db.query(*columns).filter(Task.id.in_(requested[start:start + _IN_CHUNK])).all()
+        found = {row.id for row in rows}
+        rejected += [{"id": task_id, "reason": "not_found"} for task_id in requested if task_id not in found]
+    else:
+        f = payload.filter
+        role = user_project_role(db, current_user.id, f.project_id)
+        if role is None:
+            raise HTTPException(status_code=403, detail="プロジェクトメンバーのみ変更可能です")
+        rows = (
+            db.query(*columns)
+            .filter(*_project_task_filters(db, f.project_id, f.status, f.assignee_id, f.priority, f.parent_id, f.search))
+            .filter(visible_tasks_clause(current_user.id, role))
+            .all()
+        )
+
+    # 権限チェック（行は Task と同名の属性を持つので can_* をそのまま使える）
+    prime_project_roles(db, current_user.id, {row.project_id for row in rows})
+    needs_modify = payload.priority is not None or set_assignee
+    allowed = []
+    for row in rows:
+        ok = payload.status is None or can_change_status(db, current_user, row)
+        if ok and needs_modify:
+            ok = can_modify_task(db, current_user, row)
+        if ok:
+            allowed.append(row)
+        else:
+            rejected.append({"id": row.id, "reason": "forbidden"})
+
+    values = {}
+    if payload.status is not None:
+        values["status"] = payload.status
+    if set_assignee:
+        values["assignee_id"] = payload.assignee_id
+    if payload.priority is not None:
+        values["priority"] = payload.priority
+
+    action_types = {"status": "STATUS_CHANGE", "assignee_id": "ASSIGNEE_CHANGE", "priority": "PRIORITY_CHANGE"}
+    changed_ids, unchanged_ids, histories = [], [], []
+    for row in allowed:
+        diffs = [(key, getattr(row, key), value) for key, value in values.items() if getattr(row, key) != value]
+        if not diffs:
+            unchanged_ids.append(row.id)
+            continue
+        changed_ids.append(row.id)
+        for key, old, new in diffs:
+            histories.append({
+                "task_id": row.id,
+                "user_id": current_user.id,
+                "action_type": action_types[key],
+                "changes": f"{old} -> {new}",
+            })
+
+    # updated_at はモデルの onupdate で付与される
+    for start in range(0, len(changed_ids), _IN_CHUNK):
+        db.execute(
+            update(Task)
+            .where(Task.id.in_(changed_ids[start:start + _IN_CHUNK]))
+            .values(**values, updated_by=current_user.id),
+            execution_options={"synchronize_session": False},
+        )
+    if histories:
+        db.execute(insert(TaskHistory), histories)
+    db.commit()
+
+    # 購読者のいるプロジェクトだけ、更新後のタスクを読み直して通知する
+    changed = set(changed_ids)
+    notify_ids = [
+        row.id for row in allowed
+        if row.id in changed and hub.has_subscribers(row.project_id)
+    ]
+    by_project: dict[int, list[TaskRead]] = {}
+    for start in range(0, len(notify_ids), _IN_CHUNK):
+        for task in db.query(Task).filter(Task.id.in_(notify_ids[start:start + _IN_CHUNK])):
+            by_project.setdefault(task.project_id, []).append(_to_task_read(task))
+    for project_id, tasks in by_project.items():
+        hub.publish(project_id, "tasks.updated", tasks=tasks)
+
+    return {"updated_ids": changed_ids, "unchanged_ids": unchanged_ids, "rejected": rejected}
 
 
 @router.get("/{task_id}", response_model=TaskRead)
+@async_endpoint
 def get_task(
     task_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     # タスクを取得
     task = db.query(Task).filter(Task.id == task_id).first()
@@ -115,14 +494,20 @@ def get_task(
             detail="このタスクを閲覧する権限がありません"
         )
 
+    etag = _task_etag(task)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return task
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+@async_endpoint
+@retry_on_busy
 def delete_task(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     # タスクを取得
     task = db.query(Task).filter(Task.id == task_id).first()
@@ -140,25 +525,25 @@ def delete_task(
             detail="このタスクを削除する権限がありません"
         )
 
-    # 履歴記録（DELETE）
-    history = TaskHistory(
-        task_id=task.id,
-        user_id=current_user.id,
-        action_type="DELETE",
-        changes=None,
-    )
-    db.add(history)
+    # 子孫タスクと履歴は DB の ON DELETE CASCADE で消える（行は読み込まない）。
+    # 削除の記録は変更ログ（task_changes）のトゥームストーンに残る。通知用に子孫の id を控えておく。
+    project_id = task.project_id
+    deleted_ids = [task.id]
+    if hub.has_subscribers(project_id):
+        deleted_ids += [tid for (tid,) in db.query(Task.id).filter(*descendants_filter(task))]
     db.delete(task)
     db.commit()
+    hub.publish(project_id, "tasks.deleted", task_ids=deleted_ids)
 
     return None
 
 
 @router.get("/{task_id}/children", response_model=list[TaskRead])
+@async_endpoint
 def list_children(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     parent = db.query(Task).filter(Task.id == task_id).first()
     if not parent:
@@ -168,22 +553,153 @@ def list_children(
     return parent.children
 
 
+@router.get("/{task_id}/ancestors", response_model=list[TaskRead])
+@async_endpoint
+def list_ancestors(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """タスクの祖先（パンくずリスト用）。根が先頭で、親が末尾。
+    祖先の id は path に入っているので、再帰せずに1回の IN 検索で取れる。"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="タスクが見つかりません")
+    if not can_view_task(db, current_user, task):
+        raise HTTPException(status_code=403, detail="権限がありません")
+    ids = ancestor_ids(task)
+    if not ids:
+        return []
+    return db.query(Task).filter(Task.id.in_(ids)).order_by(Task.depth).all()
+
+
+def _load_tree(db: Session, anchor, max_depth: int | None) -> list[dict]:
+    """anchor の条件に合うタスクを根として、子孫を WITH RECURSIVE 1回で取得し入れ子に組み立てる。
+    深さ順・id 順に並べて取得するので、親は必ず子より先に現れ、1パスで組み立てられる。"""
+    depth_limit = TASK_TREE_MAX_DEPTH if max_depth is None else min(max_depth, TASK_TREE_MAX_DEPTH)
+    subtree = (
+        select(Task.id.label("id"), literal(0, Integer).label("depth"))
+        .where(anchor)
+        .cte("subtree", recursive=True)
+    )
+    subtree = subtree.union_all(
+        select(Task.id, subtree.c.depth + 1)
+        .join(subtree, Task.parent_id == subtree.c.id)
+        .where(subtree.c.depth < depth_limit)
+    )
+    rows = (
+        db.query(Task, subtree.c.depth)
+        .join(subtree, Task.id == subtree.c.id)
+        .order_by(subtree.c.depth, Task.id)
+        .all()
+    )
+
+    # children リレーションを触ると遅延ロードになるので、列だけを dict に写す
+    fields = list(TaskRead.model_fields)
+    nodes: dict[int, dict] = {}
+    roots = []
+    for task, depth in rows:
+        if task.id in nodes:
+            # 親子が循環している場合は最初に現れた位置だけを使う
+            continue
+        node = {name: getattr(task, name) for name in fields}
+        node["children"] = []
+        nodes[task.id] = node
+        if depth == 0:
+            roots.append(node)
+        else:
+            nodes[task.parent_id]["children"].append(node)
+    return roots
+
+
+@router.get("/{task_id}/tree", response_model=TaskTreeNode)
+@async_endpoint
+def get_task_tree(
+    task_id: int,
+    max_depth: int | None = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """タスクとその子孫をまとめて取得する（/children を階層ごとに呼ぶ代わり）。
+    max_depth=1 なら直下の子まで。閲覧権限は /children と同じく根のタスクで判定する。"""
+    root = db.query(Task).filter(Task.id == task_id).first()
+    if not root:
+        raise HTTPException(status_code=404, detail="タスクが見つかりません")
+    if not can_view_task(db, current_user, root):
+        raise HTTPException(status_code=403, detail="権限がありません")
+    return _load_tree(db, Task.id == task_id, max_depth)[0]
+
+
+@router.get("/projects/{project_id}/tree", response_model=list[TaskTreeNode])
+@async_endpoint
+def get_project_tree(
+    project_id: int,
+    max_depth: int | None = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """プロジェクトの全タスクを階層構造で取得する。トップレベル（parent_id が NULL）が根。
+    メンバー（ADMIN/VIEWER）は全タスクを閲覧できるので、メンバーかどうかだけ確認する。"""
+    role = user_project_role(db, current_user.id, project_id)
+    if role is None:
+        raise HTTPException(status_code=403, detail="プロジェクトメンバーのみ閲覧可能です")
+    anchor = (Task.project_id == project_id) & (Task.parent_id == None)  # noqa: E711
+    return _load_tree(db, anchor, max_depth)
+
+
 @router.get("/projects/{project_id}/roots", response_model=list[TaskRead])
+@async_endpoint
 def list_project_roots(
     project_id: int,
+    limit: int | None = None,
+    offset: int = 0,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     # プロジェクトのトップレベルタスク（parent_id が NULL）
-    tasks = db.query(Task).filter(Task.project_id == project_id, Task.parent_id == None).all()  # noqa: E711
-    # 任意で: 閲覧可能なものに絞る（簡易フィルター）
-    visible = [t for t in tasks if can_view_task(db, current_user, t)]
-    return visible
+    # 閲覧可能なものに絞る条件はSQL側で評価する（limit 未指定なら全件）
+    q = (
+        db.query(Task)
+        .filter(Task.project_id == project_id, Task.parent_id == None)  # noqa: E711
+        .filter(visible_tasks_clause(current_user.id))
+        .order_by(Task.id)
+    )
+    if offset:
+        q = q.offset(offset)
+    if limit is not None:
+        q = q.limit(limit)
+    return q.all()
+
+
+def _project_task_query(
+    db: Session,
+    current_user: CurrentUser,
+    project_id: int,
+    status: str | None,
+    assignee_id: int | None,
+    priority: int | None,
+    parent_id: int | None,
+    search: str | None,
+):
+    """タスク一覧（オフセット方式・カーソル方式共通）の絞り込み済みクエリ。メンバー以外は 403。"""
+    role = user_project_role(db, current_user.id, project_id)
+    # 所有者も許可（Project.owner_idチェックは簡易化のため省略。projects.get で担保想定）
+    if role is None:
+        raise HTTPException(status_code=403, detail="プロジェクトメンバーのみ閲覧可能です")
+
+    q = db.query(Task).filter(
+        *_project_task_filters(db, project_id, status, assignee_id, priority, parent_id, search)
+    )
+    # 閲覧権限はSQL側で評価する（ページ内の件数が減らないように）
+    return q.filter(visible_tasks_clause(current_user.id, role))
 
 
 @router.get("/projects/{project_id}", response_model=list[TaskRead])
+@async_endpoint
 def list_project_tasks(
     project_id: int,
+    request: Request,
+    response: Response,
     status: str | None = None,
     assignee_id: int | None = None,
     priority: int | None = None,
@@ -192,82 +708,219 @@ def list_project_tasks(
     limit: int = 50,
     offset: int = 0,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    """プロジェクト内のタスク一覧。
+    """プロジェクト内のタスク一覧（オフセット方式。互換性のために残している）。
     - メンバーのみ閲覧可。VIEWER/ADMIN/所有者を想定。
-    - 未来拡張: 合計件数 total を返すレスポンス型に変更予定。
+    - 深いページや更新中のページングには /projects/{project_id}/page（カーソル方式）を使う。
+    """
+    q = _project_task_query(db, current_user, project_id, status, assignee_id, priority, parent_id, search)
+    # 変更がなければタスク行を読まずに 304
+    etag = _task_list_etag(db, request, current_user.id, project_id)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    # 同じ updated_at のタスクの順序が揺れないよう id を第2キーにする
+    q = q.order_by(Task.updated_at.desc(), Task.id.desc())
+    return q.offset(offset).limit(limit).all()
+
+
+@router.get("/projects/{project_id}/page", response_model=TaskPage)
+@async_endpoint
+def list_project_tasks_page(
+    project_id: int,
+    request: Request,
+    response: Response,
+    status: str | None = None,
+    assignee_id: int | None = None,
+    priority: int | None = None,
+    parent_id: int | None = None,
+    search: str | None = None,
+    limit: int = Query(50, ge=1, le=TASK_PAGE_MAX),
+    cursor: str | None = None,
+    with_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """プロジェクト内のタスク一覧（カーソル方式）。並び順は updated_at の降順、同時刻は id の降順。
+    - 次のページはレスポンスの next_cursor を cursor に渡して取得する（None なら最後のページ）。
+    - ページング中にタスクが更新されても、取得済みの位置より後ろの行が重複・欠落しない。
+    - with_total=true のときだけ件数を別の COUNT で数える。
+    """
+    q = _project_task_query(db, current_user, project_id, status, assignee_id, priority, parent_id, search)
+    etag = _task_list_etag(db, request, current_user.id, project_id)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    items, next_cursor = paginate(q, (Task.updated_at, Task.id), limit, cursor)
+    page = TaskPage(items=[_to_task_read(task) for task in items], next_cursor=next_cursor)
+    if with_total:
+        page.total, page.total_is_exact = count_capped(db, q)
+    return page
+
+
+@router.get("/projects/{project_id}/changes", response_model=TaskChanges)
+@async_endpoint
+def list_project_task_changes(
+    project_id: int,
+    since: str | None = None,
+    limit: int = Query(500, ge=1, le=TASK_CHANGES_MAX),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """前回の取得以降に作成・更新・削除されたタスク（差分同期用）。
+    - since を省略すると全件（初回同期）。以降はレスポンスの cursor を since に渡す。
+    - 同じタスクが何度変更されても最新の状態が1回だけ返る。削除されたものは deleted に id だけ返る。
+    - cursor はサーバーが採番する変更通番なので、クライアントやサーバーの時計には依存しない。
     """
-    from app.core.permissions import user_project_role, ROLE_ADMIN, ROLE_VIEWER
     role = user_project_role(db, current_user.id, project_id)
-    # 所有者も許可（Project.owner_idチェックは簡易化のため省略。projects.get で担保想定）
     if role is None:
         raise HTTPException(status_code=403, detail="プロジェクトメンバーのみ閲覧可能です")
+    since_seq = decode_cursor(since, 1)[0] if since else 0
+    if not isinstance(since_seq, int):
+        raise HTTPException(status_code=400, detail="since が不正です")
 
-    q = db.query(Task).filter(Task.project_id == project_id)
-    if parent_id is not None:
-        q = q.filter(Task.parent_id == parent_id)
+    rows = (
+        db.query(TaskChange.seq, TaskChange.task_id, TaskChange.deleted, Task)
+        .outerjoin(Task, Task.id == TaskChange.task_id)
+        .filter(TaskChange.project_id == project_id, TaskChange.seq > since_seq)
+        .order_by(TaskChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed, deleted = [], []
+    for _, task_id, is_deleted, task in rows:
+        if is_deleted or task is None:
+            deleted.append(task_id)
+        else:
+            changed.append(task)
+    last_seq = rows[-1][0] if rows else since_seq
+    return {"changed": changed, "deleted": deleted, "cursor": encode_cursor(last_seq), "has_more": has_more}
+
+
+@router.get("/projects/{project_id}/search", response_model=list[TaskSearchHit])
+@async_endpoint
+def search_project_tasks(
+    project_id: int,
+    q: str,
+    status: str | None = None,
+    assignee_id: int | None = None,
+    limit: int = Query(20, ge=1, le=TASK_PAGE_MAX),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """タイトル・説明の全文検索（関連度順、一致箇所のスニペット付き）。入力途中の語にも一致する。
+    SQLite（trigram）では3文字未満の語を含むと部分一致検索になり、その場合は更新日時の新しい順。"""
+    role = user_project_role(db, current_user.id, project_id)
+    if role is None:
+        raise HTTPException(status_code=403, detail="プロジェクトメンバーのみ閲覧可能です")
+    filters = _project_task_filters(db, project_id, status, assignee_id)
+    filters.append(visible_tasks_clause(current_user.id, role))
+
+    hits = []
+    for task, score, title_snippet, description_snippet in search_tasks(db, q, filters, limit):
+        hit = _to_task_read(task, TaskSearchHit)
+        hit.score = score
+        hit.title_snippet = title_snippet
+        hit.description_snippet = description_snippet
+        hits.append(hit)
+    return hits
+
+
+def _assigned_task_query(
+    db: Session,
+    user_id: int,
+    status: str | None,
+    project_id: int | None,
+    deadline_from: datetime | None,
+    deadline_to: datetime | None,
+):
+    """自分が担当のタスク。プロジェクト名と作成者名は同じ SELECT の JOIN で読み込む
+    （プロジェクトごとの遅延ロードを起こさない）。"""
+    q = (
+        db.query(Task)
+        .join(Task.project)
+        .outerjoin(Project.creator)
+        .options(
+            contains_eager(Task.project).load_only(Project.name, Project.creator_id),
+            contains_eager(Task.project, Project.creator).load_only(User.username),
+        )
+        .filter(Task.assignee_id == user_id)
+    )
     if status is not None:
         q = q.filter(Task.status == status)
-    if assignee_id is not None:
-        q = q.filter(Task.assignee_id == assignee_id)
-    if priority is not None:
-        q = q.filter(Task.priority == priority)
-    if search:
-        # 簡易検索（タイトル・説明の部分一致）。後で全文検索に拡張予定。
-        like = f"%{search}%"
-        q = q.filter((Task.title.ilike(like)) | (Task.description.ilike(like)))
+    if project_id is not None:
+        q = q.filter(Task.project_id == project_id)
+    # 期限での絞り込み（両端を含む）。期限なしのタスクはどちらかを指定すると除外される。
+    if deadline_from is not None:
+        q = q.filter(Task.deadline >= _jst_naive(deadline_from))
+    if deadline_to is not None:
+        q = q.filter(Task.deadline <= _jst_naive(deadline_to))
+    return q
 
-    q = q.order_by(Task.updated_at.desc())
-    items = q.offset(offset).limit(limit).all()
 
-    # 念のため各タスクに対して閲覧権限チェック（ロールの差分対応用）
-    visible = [t for t in items if can_view_task(db, current_user, t)]
-    return visible
+def _to_assigned_read(task: Task) -> TaskWithProjectRead:
+    creator = task.project.creator
+    return TaskWithProjectRead.model_construct(
+        **_to_task_read(task).__dict__,
+        project_name=task.project.name,
+        project_creator_username=creator.username if creator else "Unknown",
+    )
 
 
 @router.get("/assigned/me", response_model=list[TaskWithProjectRead])
+@async_endpoint
 def list_my_assigned_tasks(
+    status: str | None = None,
+    project_id: int | None = None,
+    deadline_from: datetime | None = None,
+    deadline_to: datetime | None = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    # 自分が担当のタスクをプロジェクト情報付きで返す
-    tasks = (
-        db.query(Task, Project)
-        .join(Project, Task.project_id == Project.id)
-        .filter(Task.assignee_id == current_user.id)
-        .order_by(Task.updated_at.desc())
-        .all()
-    )
+    """自分が担当のタスクをプロジェクト情報付きで返す（全件。件数が多い場合は /assigned/me/page を使う）。"""
+    q = _assigned_task_query(db, current_user.id, status, project_id, deadline_from, deadline_to)
+    tasks = q.order_by(Task.updated_at.desc(), Task.id.desc()).all()
+    return [_to_assigned_read(task) for task in tasks]
 
-    result = []
-    for task, project in tasks:
-        result.append({
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "deadline": task.deadline,
-            "project_id": task.project_id,
-            "parent_id": task.parent_id,
-            "status": task.status,
-            "priority": task.priority,
-            "assignee_id": task.assignee_id,
-            "created_by": task.created_by,
-            "updated_by": task.updated_by,
-            "created_at": task.created_at,
-            "updated_at": task.updated_at,
-            "project_name": project.name,
-            "project_creator_username": project.creator.username if project.creator else "Unknown",
-        })
-    return result
+
+@router.get("/assigned/me/page", response_model=TaskWithProjectPage)
+@async_endpoint
+def list_my_assigned_tasks_page(
+    status: str | None = None,
+    project_id: int | None = None,
+    deadline_from: datetime | None = None,
+    deadline_to: datetime | None = None,
+    limit: int = Query(50, ge=1, le=TASK_PAGE_MAX),
+    cursor: str | None = None,
+    with_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """自分が担当のタスク（カーソル方式）。並び順・cursor・with_total は /projects/{project_id}/page と同じ。
+    件数やプロジェクト数に関係なく、1ページ1クエリ（with_total なら2クエリ）。
+    """
+    q = _assigned_task_query(db, current_user.id, status, project_id, deadline_from, deadline_to)
+    items, next_cursor = paginate(q, (Task.updated_at, Task.id), limit, cursor)
+    page = TaskWithProjectPage(items=[_to_assigned_read(task) for task in items], next_cursor=next_cursor)
+    if with_total:
+        page.total, page.total_is_exact = count_capped(db, q)
+    return page
 
 
 @router.patch("/{task_id}/status", response_model=TaskRead)
+@async_endpoint
+@retry_on_busy
 def update_status(
     task_id: int,
     payload: TaskStatusUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
@@ -275,75 +928,85 @@ def update_status(
     # ステータスは VIEWER も変更可（要メンバー）。担当者・作成者・ADMINも可。
     if not can_change_status(db, current_user, task):
         raise HTTPException(status_code=403, detail="権限がありません（ステータス変更）")
+    check_if_match(request, _task_etag(task))
     old = task.status
     task.status = payload.status
     task.updated_by = current_user.id
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    db.add(TaskHistory(task_id=task.id, user_id=current_user.id, action_type="STATUS_CHANGE", changes=f"{old} -> {task.status}"))
-    db.commit()
-    return task
+    result = _commit_task(db, task, current_user.id, "STATUS_CHANGE", f"{old} -> {task.status}")
+    set_etag(response, _task_etag(result))
+    hub.publish(result.project_id, "tasks.updated", tasks=[result])
+    return result
 
 
 @router.patch("/{task_id}/assignee", response_model=TaskRead)
+@async_endpoint
+@retry_on_busy
 def update_assignee(
     task_id: int,
     payload: TaskAssigneeUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="タスクが見つかりません")
     if not can_modify_task(db, current_user, task):
         raise HTTPException(status_code=403, detail="権限がありません")
+    check_if_match(request, _task_etag(task))
     old = task.assignee_id
     task.assignee_id = payload.assignee_id
     task.updated_by = current_user.id
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    db.add(TaskHistory(task_id=task.id, user_id=current_user.id, action_type="ASSIGNEE_CHANGE", changes=f"{old} -> {task.assignee_id}"))
-    db.commit()
-    return task
+    result = _commit_task(db, task, current_user.id, "ASSIGNEE_CHANGE", f"{old} -> {task.assignee_id}")
+    set_etag(response, _task_etag(result))
+    hub.publish(result.project_id, "tasks.updated", tasks=[result])
+    return result
 
 
 @router.patch("/{task_id}/priority", response_model=TaskRead)
+@async_endpoint
+@retry_on_busy
 def update_priority(
     task_id: int,
     payload: TaskPriorityUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="タスクが見つかりません")
     if not can_modify_task(db, current_user, task):
         raise HTTPException(status_code=403, detail="権限がありません")
+    check_if_match(request, _task_etag(task))
     old = task.priority
     task.priority = payload.priority
     task.updated_by = current_user.id
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    db.add(TaskHistory(task_id=task.id, user_id=current_user.id, action_type="PRIORITY_CHANGE", changes=f"{old} -> {task.priority}"))
-    db.commit()
-    return task
+    result = _commit_task(db, task, current_user.id, "PRIORITY_CHANGE", f"{old} -> {task.priority}")
+    set_etag(response, _task_etag(result))
+    hub.publish(result.project_id, "tasks.updated", tasks=[result])
+    return result
 
 
 @router.patch("/{task_id}", response_model=TaskRead)
+@async_endpoint
+@retry_on_busy
 def update_task(
     task_id: int,
     payload: TaskUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="タスクが見つかりません")
     if not can_modify_task(db, current_user, task):
         raise HTTPException(status_code=403, detail="権限がありません")
+    check_if_match(request, _task_etag(task))
 
     before = {
         "title": task.title,
@@ -359,26 +1022,30 @@ def update_task(
     if payload.description is not None:
         task.description = payload.description
     if payload.deadline is not None:
-        task.deadline = payload.deadline
+        task.deadline = _jst_naive(payload.deadline)
     if payload.priority is not None:
         task.priority = payload.priority
     if payload.assignee_id is not None:
         task.assignee_id = payload.assignee_id
-    if payload.parent_id is not None:
-        task.parent_id = payload.parent_id
+    if payload.parent_id is not None and payload.parent_id != task.parent_id:
+        new_parent = db.query(Task).filter(Task.id == payload.parent_id).first()
+        if new_parent is None or new_parent.project_id != task.project_id:
+            raise HTTPException(status_code=400, detail="親タスクが同じプロジェクト内に見つかりません")
+        if would_create_cycle(task, new_parent):
+            raise HTTPException(status_code=400, detail="自分自身や子孫のタスクを親にすることはできません")
+        # 子孫の path もまとめて付け替える（同じトランザクション内）
+        move_subtree(db, task, new_parent)
 
     task.updated_by = current_user.id
-    db.add(task)
-    db.commit()
-    db.refresh(task)
 
     changes = []
     for k in before:
         after_val = getattr(task, k)
         if before[k] != after_val:
             changes.append(f"{k}:{before[k]}->{after_val}")
-    if changes:
-        db.add(TaskHistory(task_id=task.id, user_id=current_user.id, action_type="UPDATE", changes=", ".join(changes)))
-        db.commit()
 
-    return task
+    # 変更がなければ履歴は残さない（updated_by の更新のみ）
+    result = _commit_task(db, task, current_user.id, "UPDATE" if changes else None, ", ".join(changes))
+    set_etag(response, _task_etag(result))
+    hub.publish(result.project_id, "tasks.updated", tasks=[result])
+    return result
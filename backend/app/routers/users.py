@@ -1,11 +1,15 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.database.session import get_db
+from app.database.session import get_db, get_request_db, run_db, retry_on_busy, async_endpoint
 from app.models.user import User
+from app.models.project_member import ProjectMember
 from app.schemas.user import UserCreate, UserRead, UserUpdate
-from app.core.security import hash_password
-from app.core.auth import get_current_user
+from app.core.security import hash_password_async
+from app.core.auth import CurrentUser, get_current_user, invalidate_user
 
 
 
@@ -16,51 +20,68 @@ router = APIRouter(
 
 
 # ユーザー作成（新規登録）
+def _username_exists(db: Session, username: str) -> bool:
+    return db.query(User.id).filter(User.username == username).first() is not None
+
+
+def _insert_user(db: Session, new_user: User) -> User:
+    db.add(new_user)
+
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
+
+# ハッシュ化は専用の実行器で行う（login と同じ理由で async）
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_in: UserCreate, db: Session = Depends(get_request_db)):
 
     # 既存ユーザー確認
-    existing = db.query(User).filter(User.username == user_in.username).first()
-    if existing:
+    if await run_db(db, _username_exists, user_in.username):
         raise HTTPException(
             status_code=400,
             detail="ユーザー名はすでに使用されています"
         )
 
     # パスワードをハッシュ化
-    hashed_pw = hash_password(user_in.password)
+    hashed_pw = await hash_password_async(user_in.password)
 
     new_user = User(
         username=user_in.username,
         hashed_password=hashed_pw
     )
 
-    db.add(new_user)
-
-    db.commit()
-    db.refresh(new_user)
-
-    return new_user
+    return await run_db(db, _insert_user, new_user)
 
 
 # 全ユーザー取得（デバッグ用）
 @router.get("/all", response_model=list[UserRead])
+@async_endpoint
 def get_all_users(db: Session = Depends(get_db)):
     users = db.query(User).all()
     return users
 
 @router.patch("/icon")
+@async_endpoint
+@retry_on_busy
 def icon_change(
     payload: UserUpdate, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     ):
-    
-    if payload.icon is not None:
-        current_user.icon = payload.icon 
+    # current_user はキャッシュされた軽量オブジェクトなので、更新用にDBから取り直す
+    user = db.query(User).filter(User.id == current_user.id).first()
+
+    if payload.icon is not None and payload.icon != user.icon:
+        user.icon = payload.icon
+        # メンバー一覧にもアイコンが載るので、参加中のプロジェクトのメンバー一覧の ETag を変える
+        db.query(ProjectMember).filter(ProjectMember.user_id == user.id).update(
+            {ProjectMember.updated_at: datetime.now(ZoneInfo("Asia/Tokyo"))}, synchronize_session=False
+        )
 
-    db.add(current_user)
+    db.add(user)
     db.commit()
-    db.refresh(current_user)
+    db.refresh(user)
+    invalidate_user(user.id)
 
-    return current_user
\ No newline at end of file
+    return user
\ No newline at end of file
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+
+
+class JobRead(BaseModel):
+    """バックグラウンドジョブの状態（GET /jobs/{job_id}）。"""
+    id: int
+    kind: str
+    # queued / running / succeeded / failed / cancelled
+    status: str
+    params: Any = None
+    project_id: Optional[int] = None
+    # 進捗（progress_total が None の間は件数が未確定）
+    progress_done: int
+    progress_total: Optional[int] = None
+    attempts: int
+    max_attempts: int
+    cancel_requested: bool
+    # 成功時の結果・最後の失敗内容
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
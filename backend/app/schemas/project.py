@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
+from app.schemas.task import TaskRead
+
 class ProjectBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -38,7 +40,57 @@ class ProjectMemberRead(ProjectMemberBase):
     project_id: int
     user_id: int
     username: str  # ユーザー名も含める
+    icon: Optional[int] = None  # ユーザーのアイコン番号
     invited_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ProjectTaskReassign(BaseModel):
+    """担当者の一括付け替え（POST /projects/{project_id}/reassign）。"""
+    from_user_id: int
+    to_user_id: int
+
+
+class ProjectMemberPage(BaseModel):
+    """メンバー一覧（カーソル方式）の1ページ分。"""
+    items: list[ProjectMemberRead]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_exact: Optional[bool] = None
+
+
+class ProjectMembers(BaseModel):
+    """複数プロジェクトのメンバー一覧（GET /projects/members）の1プロジェクト分。"""
+    project_id: int
+    members: list[ProjectMemberRead]
+
+
+class ProjectAssigneeStats(BaseModel):
+    assignee_id: Optional[int] = None  # None は担当者なし
+    username: Optional[str] = None
+    total: int
+    completed: int
+
+
+class ProjectStats(BaseModel):
+    project_id: int
+    total: int
+    by_status: dict[str, int]  # not_started / in_progress / completed
+    by_priority: dict[int, int]
+    by_assignee: list[ProjectAssigneeStats]  # 件数の多い順
+    overdue: int  # 期限切れで未完了
+    root_tasks: int  # 親タスク（parent_id が NULL）
+    subtasks: int
+    completion_rate: float  # 完了率（%）。タスクがなければ 0
+
+
+class ProjectDashboardItem(ProjectRead):
+    role: Optional[str] = None  # ADMIN / VIEWER。メンバー登録のない所有者は None
+    is_owner: bool
+    member_count: int
+    task_total: int
+    task_counts: dict[str, int]  # ステータス別の件数
+    my_open_task_count: int  # 自分が担当の未完了タスク数
+    my_open_tasks: list[TaskRead]  # そのうち期限の近い順に最大 DASHBOARD_TASKS_PER_PROJECT 件
@@ -33,10 +33,100 @@ class TaskRead(TaskBase):
     updated_at: Optional[datetime] = None
 
 
+class TaskBulkCreateItem(TaskCreate):
+    # 同一リクエスト内で親子関係を作るためのクライアント側一時ID
+    client_id: Optional[str] = None
+    # 親がこのリクエスト内で作るタスクの場合は parent_id の代わりにこちらを指定
+    parent_client_id: Optional[str] = None
+
+
+class TaskBulkCreate(BaseModel):
+    tasks: list[TaskBulkCreateItem]
+
+
+class TaskBulkCreatedRead(TaskRead):
+    client_id: Optional[str] = None
+
+
+class TaskListFilter(BaseModel):
+    """GET /tasks/projects/{project_id} と同じ絞り込み条件。"""
+    project_id: int
+    status: Optional[str] = None
+    assignee_id: Optional[int] = None
+    priority: Optional[int] = None
+    parent_id: Optional[int] = None
+    search: Optional[str] = None
+
+
+class TaskBulkUpdate(BaseModel):
+    # 対象は task_ids か filter のどちらか一方で指定
+    task_ids: Optional[list[int]] = None
+    filter: Optional[TaskListFilter] = None
+
+    # 変更内容（指定したものだけ変更）。assignee_id は null を明示すると担当者なしにする。
+    status: Optional[str] = None
+    assignee_id: Optional[int] = None
+    priority: Optional[int] = None
+
+
+class TaskBulkRejected(BaseModel):
+    id: int
+    reason: str  # not_found / forbidden
+
+
+class TaskBulkUpdateResult(BaseModel):
+    updated_ids: list[int]
+    # 権限はあるが値が変わらなかったタスク（更新・履歴記録なし）
+    unchanged_ids: list[int]
+    rejected: list[TaskBulkRejected]
+
+
+class TaskTreeNode(TaskRead):
+    # 子タスク（id 順）。max_depth で打ち切った階層では空。
+    children: list["TaskTreeNode"] = []
+
+
+class TaskPage(BaseModel):
+    """キーセットページネーションの1ページ分。"""
+    items: list[TaskRead]
+    # 次のページの取得に使うカーソル。最後のページなら None。
+    next_cursor: Optional[str] = None
+    # with_total=true のときだけ。件数が多い場合は上限で打ち切り、total_is_exact=False になる。
+    total: Optional[int] = None
+    total_is_exact: Optional[bool] = None
+
+
+class TaskChanges(BaseModel):
+    """差分同期のレスポンス。cursor を次回の since に渡す。"""
+    # 作成・更新されたタスク（変更順）
+    changed: list[TaskRead]
+    # 削除されたタスクの id
+    deleted: list[int]
+    cursor: str
+    # True なら limit で打ち切ったので、すぐに cursor で続きを取得する
+    has_more: bool
+
+
+class TaskSearchHit(TaskRead):
+    # 関連度（大きいほど上位）。部分一致検索にフォールバックした場合は 0。
+    score: float = 0.0
+    # 一致箇所を <mark></mark> で囲んだ抜粋。本文は HTML エスケープ済み（<mark> 以外のタグは含まない）。
+    title_snippet: Optional[str] = None
+    description_snippet: Optional[str] = None
+
+
 class TaskWithProjectRead(TaskRead):
     project_name: str
     project_creator_username: str
 
+
+class TaskWithProjectPage(BaseModel):
+    """自分が担当のタスク一覧（カーソル方式）の1ページ分。"""
+    items: list[TaskWithProjectRead]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_exact: Optional[bool] = None
+
 class TaskStatusUpdate(BaseModel):
     status: str  # not_started / in_progress / completed
 
@@ -1,10 +1,11 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
-from app.database.session import DATABASE_URL
+from app.database.session import DATABASE_URL, create_app_engine
 from app.database.session import Base 
+# Import models so that Base.metadata is populated for autogenerate
+from app.models import user, project, project_member, task, task_history, task_change, job  # noqa: F401
 
 from alembic import context
 
@@ -64,13 +65,19 @@ def run_migrations_online() -> None:
     if DATABASE_URL:
         config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
+    # Same connect args / timeouts as the app engine, without pooling
+    connectable = create_app_engine(
+        config.get_main_option("sqlalchemy.url"),
         poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # The app turns foreign keys on; batch mode rebuilds tables with DROP TABLE,
+            # which would fire ON DELETE CASCADE. PRAGMA foreign_keys has no effect inside a transaction.
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
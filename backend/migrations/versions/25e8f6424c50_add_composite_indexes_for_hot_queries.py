@@ -0,0 +1,62 @@
+"""add composite indexes for hot queries
+
+Revision ID: 25e8f6424c50
+Revises: 1ad71369e0dd
+Create Date: 2026-10-17 10:12:31.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '25e8f6424c50'
+down_revision: Union[str, Sequence[str], None] = '1ad71369e0dd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Drop duplicate memberships (keep the oldest row) so the unique index can be built
+    op.execute(
+        "DELETE FROM project_members WHERE id NOT IN ("
+        "SELECT MIN(id) FROM project_members GROUP BY project_id, user_id)"
+    )
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_project_id_parent_id', ['project_id', 'parent_id'], unique=False)
+        batch_op.create_index('ix_tasks_project_id_updated_at', ['project_id', 'updated_at'], unique=False)
+        batch_op.create_index('ix_tasks_assignee_id_updated_at', ['assignee_id', 'updated_at'], unique=False)
+        batch_op.create_index('ix_tasks_parent_id', ['parent_id'], unique=False)
+
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.create_index('uq_project_members_project_id_user_id', ['project_id', 'user_id'], unique=True)
+        batch_op.create_index('ix_project_members_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('task_histories', schema=None) as batch_op:
+        batch_op.create_index('ix_task_histories_task_id_created_at', ['task_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_projects_creator_id'), ['creator_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_projects_creator_id'))
+
+    with op.batch_alter_table('task_histories', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_histories_task_id_created_at')
+
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.drop_index('ix_project_members_user_id')
+        batch_op.drop_index('uq_project_members_project_id_user_id')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_parent_id')
+        batch_op.drop_index('ix_tasks_assignee_id_updated_at')
+        batch_op.drop_index('ix_tasks_project_id_updated_at')
+        batch_op.drop_index('ix_tasks_project_id_parent_id')
@@ -0,0 +1,32 @@
+"""add updated_at to project_members
+
+Revision ID: 4b9e17f3c2d6
+Revises: 7d41c2e9a0b8
+Create Date: 2026-10-17 16:41:09.551302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e17f3c2d6'
+down_revision: Union[str, Sequence[str], None] = '7d41c2e9a0b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE project_members SET updated_at = invited_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
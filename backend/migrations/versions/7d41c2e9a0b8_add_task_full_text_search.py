@@ -0,0 +1,32 @@
+"""add task full text search
+
+Revision ID: 7d41c2e9a0b8
+Revises: c3c82138ebd3
+Create Date: 2026-10-17 15:20:44.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.search import drop_search_index, install_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d41c2e9a0b8'
+down_revision: Union[str, Sequence[str], None] = 'c3c82138ebd3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite: FTS5 (trigram) table + sync triggers, filled from existing rows.
+    # PostgreSQL: GIN expression index over to_tsvector(title, description).
+    install_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_search_index(op.get_bind())
@@ -0,0 +1,65 @@
+"""add task change log
+
+Revision ID: 9f2a6d8e5b13
+Revises: 4b9e17f3c2d6
+Create Date: 2026-10-17 18:02:37.114690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.change_log import drop_change_log, install_change_log
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2a6d8e5b13'
+down_revision: Union[str, Sequence[str], None] = '4b9e17f3c2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table(
+        'task_changes',
+        sa.Column('task_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('task_id'),
+    )
+    with op.batch_alter_table('task_changes', schema=None) as batch_op:
+        batch_op.create_index('ix_task_changes_project_id_seq', ['project_id', 'seq'], unique=False)
+
+    # Seed one change row per existing task so a first sync (no cursor) returns everything.
+    # Tasks deleted before this revision have no tombstones.
+    op.execute(
+        "INSERT INTO task_changes (task_id, project_id, seq, deleted) "
+        "SELECT id, project_id, ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY id), false "
+        "FROM tasks WHERE project_id IS NOT NULL"
+    )
+    op.execute(
+        "UPDATE projects SET change_seq = "
+        "(SELECT COUNT(*) FROM tasks WHERE tasks.project_id = projects.id)"
+    )
+
+    install_change_log(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_change_log(op.get_bind())
+
+    with op.batch_alter_table('task_changes', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_changes_project_id_seq')
+
+    op.drop_table('task_changes')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('change_seq')
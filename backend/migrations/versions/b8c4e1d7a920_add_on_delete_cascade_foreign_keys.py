@@ -0,0 +1,75 @@
+"""add on delete cascade foreign keys
+
+Revision ID: b8c4e1d7a920
+Revises: 9f2a6d8e5b13
+Create Date: 2026-10-17 21:14:52.603118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.change_log import install_change_log
+from app.core.search import install_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c4e1d7a920'
+down_revision: Union[str, Sequence[str], None] = '9f2a6d8e5b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table) -- all reference <referred>.id
+FOREIGN_KEYS = {
+    'tasks': [('project_id', 'projects'), ('parent_id', 'tasks')],
+    'task_histories': [('task_id', 'tasks')],
+    'project_members': [('project_id', 'projects')],
+}
+# SQLite foreign keys are unnamed; batch mode reflects them under this convention so they can be dropped.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _fk_name(table: str, column: str, referred: str) -> str:
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _replace_foreign_keys(ondelete: Union[str, None]) -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, columns in FOREIGN_KEYS.items():
+        existing = {
+            tuple(fk['constrained_columns']): fk['name'] for fk in inspector.get_foreign_keys(table)
+        }
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in columns:
+                name = existing.get((column,)) or _fk_name(table, column, referred)
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(
+                    _fk_name(table, column, referred), referred, [column], ['id'], ondelete=ondelete
+                )
+
+    # Rebuilding tasks in SQLite batch mode drops its triggers; put the search index and change log back.
+    install_search_index(bind)
+    install_change_log(bind)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove rows orphaned by earlier ORM deletes (SQLite did not enforce foreign keys),
+    # otherwise the new constraints would reject them.
+    bind = op.get_bind()
+    while bind.execute(sa.text(
+        "DELETE FROM tasks WHERE project_id NOT IN (SELECT id FROM projects) "
+        "OR (parent_id IS NOT NULL AND parent_id NOT IN (SELECT id FROM tasks))"
+    )).rowcount:
+        pass
+    op.execute("DELETE FROM task_histories WHERE task_id NOT IN (SELECT id FROM tasks)")
+    op.execute("DELETE FROM project_members WHERE project_id NOT IN (SELECT id FROM projects)")
+
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_foreign_keys(None)
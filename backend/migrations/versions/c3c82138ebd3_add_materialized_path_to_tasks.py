@@ -0,0 +1,89 @@
+"""add materialized path to tasks
+
+Revision ID: c3c82138ebd3
+Revises: 25e8f6424c50
+Create Date: 2026-10-17 14:05:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3c82138ebd3'
+down_revision: Union[str, Sequence[str], None] = '25e8f6424c50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _backfill_paths(conn) -> None:
+    """Compute path/depth for every task from parent_id.
+
+    Parents that point to a missing task or to another project, and parent
+    chains that form a cycle, are cut: the task becomes a root (parent_id NULL).
+    """
+    rows = conn.execute(sa.text("SELECT id, project_id, parent_id FROM tasks")).all()
+    project_of = {row.id: row.project_id for row in rows}
+    children: dict = {}
+    roots = []
+    detached = []
+    for row in rows:
+        if row.parent_id is None:
+            roots.append(row.id)
+        elif project_of.get(row.parent_id) != row.project_id:
+            roots.append(row.id)
+            detached.append(row.id)
+        else:
+            children.setdefault(row.parent_id, []).append(row.id)
+
+    # Walk down from the roots. Tasks still unvisited afterwards sit on a cycle
+    # (or below one): detach the smallest id and walk again until all are placed.
+    computed: dict = {}
+    stack = [(task_id, "/", 0) for task_id in roots]
+    while True:
+        while stack:
+            task_id, path, depth = stack.pop()
+            if task_id in computed:
+                # the detached task of a cycle, reached again through its old parent
+                continue
+            computed[task_id] = (path, depth)
+            for child in children.get(task_id, ()):
+                stack.append((child, f"{path}{task_id}/", depth + 1))
+        remaining = sorted(project_of.keys() - computed.keys())
+        if not remaining:
+            break
+        detached.append(remaining[0])
+        stack.append((remaining[0], "/", 0))
+
+    if detached:
+        conn.execute(
+            sa.text("UPDATE tasks SET parent_id = NULL WHERE id = :id"),
+            [{"id": task_id} for task_id in detached],
+        )
+    if computed:
+        conn.execute(
+            sa.text("UPDATE tasks SET path = :path, depth = :depth WHERE id = :id"),
+            [{"id": task_id, "path": path, "depth": depth} for task_id, (path, depth) in computed.items()],
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(), server_default='/', nullable=False))
+        batch_op.add_column(sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+
+    _backfill_paths(op.get_bind())
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_project_id_path', ['project_id', 'path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_project_id_path')
+        batch_op.drop_column('depth')
+        batch_op.drop_column('path')
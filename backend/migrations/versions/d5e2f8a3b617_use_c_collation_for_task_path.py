@@ -0,0 +1,34 @@
+"""use C collation for task path
+
+Revision ID: d5e2f8a3b617
+Revises: c3d9a5f1e842
+Create Date: 2026-10-17 04:12:51.207934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e2f8a3b617'
+down_revision: Union[str, Sequence[str], None] = 'c3d9a5f1e842'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 子孫の範囲検索（path の前方一致）はバイト順の比較が前提。
+    # SQLite は既定でバイト順なので PostgreSQL だけ照合順序を "C" にする（ix_tasks_project_id_path も作り直される）。
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column('tasks', 'path', type_=sa.String(collation='C'), existing_nullable=False, existing_server_default='/')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column('tasks', 'path', type_=sa.String(), existing_nullable=False, existing_server_default='/')
@@ -0,0 +1,34 @@
+"""stop logging task moves
+
+Revision ID: e7a1c4d9f253
+Revises: d5e2f8a3b617
+Create Date: 2026-10-17 04:41:08.553120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.core.change_log import drop_change_log, install_change_log
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a1c4d9f253'
+down_revision: Union[str, Sequence[str], None] = 'd5e2f8a3b617'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 変更ログのトリガーの監視列から updated_at を外す（サブツリーの移動で子孫が記録されていた）。
+    # SQLite のトリガーは作成済みだと作り直されないので、いったん消してから作る。
+    bind = op.get_bind()
+    drop_change_log(bind)
+    install_change_log(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 以前のトリガーは移動のたびに子孫を余分に記録するだけなので戻さない
+    pass
@@ -0,0 +1,44 @@
+"""use pg_trgm for task search
+
+Revision ID: f4b8d2e6a190
+Revises: e7a1c4d9f253
+Create Date: 2026-10-17 06:18:42.730516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.core.search import drop_search_index, install_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8d2e6a190'
+down_revision: Union[str, Sequence[str], None] = 'e7a1c4d9f253'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 以前の索引（to_tsvector('simple', ...)）。空白区切りなので日本語の文中一致ができなかった。
+_OLD_PG_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING GIN "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL の全文検索索引を pg_trgm（ILIKE の部分一致を索引で絞り込む）に置き換える。SQLite は変更なし。
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_tasks_search")
+    install_search_index(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    drop_search_index(bind)
+    op.execute(_OLD_PG_INDEX)
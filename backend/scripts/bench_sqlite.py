@@ -0,0 +1,110 @@
+"""SQLite の同時読み書きベンチマーク。
+
+PRAGMA プロファイル（WAL など）と SQLITE_BUSY 再試行の有無で、
+読み取り/書き込みのスループットと "database is locked" の発生数を比較する。
+
+    cd backend
+    python -m scripts.bench_sqlite --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import session as db_session
+
+
+def _prepare(engine, rows: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE bench_tasks (id INTEGER PRIMARY KEY, status TEXT, updated_at REAL)"))
+        conn.execute(text("CREATE TABLE bench_histories (id INTEGER PRIMARY KEY, task_id INTEGER, changes TEXT)"))
+        conn.execute(
+            text("INSERT INTO bench_tasks (id, status, updated_at) VALUES (:id, 'not_started', 0)"),
+            [{"id": i} for i in range(1, rows + 1)],
+        )
+
+
+def _run(tuned: bool, readers: int, writers: int, seconds: float, rows: int) -> dict:
+    saved = dict(db_session.SQLITE_PRAGMAS)
+    if not tuned:
+        for key in db_session.SQLITE_PRAGMAS:
+            db_session.SQLITE_PRAGMAS[key] = ""
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = db_session.create_app_engine(f"sqlite:///{path}")
+    try:
+        _prepare(engine, rows)
+        stats = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        stop = time.monotonic() + seconds
+
+        def write_once(n: int) -> None:
+            with engine.begin() as conn:
+                task_id = n % rows + 1
+                conn.execute(
+                    text("UPDATE bench_tasks SET status = 'in_progress', updated_at = :t WHERE id = :id"),
+                    {"t": time.time(), "id": task_id},
+                )
+                conn.execute(
+                    text("INSERT INTO bench_histories (task_id, changes) VALUES (:id, 'status')"),
+                    {"id": task_id},
+                )
+
+        write = db_session.retry_on_busy(write_once) if tuned else write_once
+
+        def reader() -> None:
+            while time.monotonic() < stop:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text("SELECT * FROM bench_tasks ORDER BY updated_at DESC LIMIT 50")).all()
+                    key = "reads"
+                except OperationalError:
+                    key = "locked"
+                with lock:
+                    stats[key] += 1
+
+        def writer(seed: int) -> None:
+            n = seed
+            while time.monotonic() < stop:
+                try:
+                    write(n)
+                    key = "writes"
+                except OperationalError:
+                    key = "locked"
+                with lock:
+                    stats[key] += 1
+                n += writers
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return stats
+    finally:
+        engine.dispose()
+        db_session.SQLITE_PRAGMAS.update(saved)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    for label, tuned in (("default", False), ("tuned", True)):
+        stats = _run(tuned, args.readers, args.writers, args.seconds, args.rows)
+        print(
+            f"{label:8s} reads/s={stats['reads'] / args.seconds:9.1f} "
+            f"writes/s={stats['writes'] / args.seconds:9.1f} locked={stats['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# 接続先は DATABASE_URL（CI では PostgreSQL も）。未設定なら一時ディレクトリの SQLite を使う。
+# エンジンとテーブルは app の import 時に作られるので、import より前に決めること。
+# .env の DATABASE_URL（開発用 DB）は load_dotenv が上書きしないので使われない。
+if not os.environ.get("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def login(client):
+    """ユーザーを登録してログインし、認証ヘッダーを返す関数。
+    名前は毎回変えるので、使い回しの DB に対して何度実行しても衝突しない。"""
+    def register(prefix: str = "user") -> dict:
+        username = f"{prefix}-{uuid.uuid4().hex[:12]}"
+        response = client.post("/users/", json={"username": username, "password": "password"})
+        assert response.status_code == 201, response.text
+        response = client.post("/auth/login", data={"username": username, "password": "password"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return register
+
+
+@pytest.fixture
+def project(client, login):
+    """プロジェクトを1つ作り、(project_id, 作成者の認証ヘッダー) を返す。"""
+    headers = login("owner")
+    response = client.post("/projects/", json={"name": "test project"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"], headers
+
+
+@pytest.fixture
+def create_task(client, project):
+    """project のプロジェクトにタスクを作り、id を返す関数。"""
+    project_id, headers = project
+
+    def create(title: str, parent_id: int | None = None) -> int:
+        response = client.post(
+            "/tasks/", json={"title": title, "project_id": project_id, "parent_id": parent_id}, headers=headers
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return create
@@ -0,0 +1,36 @@
+import uuid
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.permissions import ROLE_ADMIN
+from app.database.session import SessionLocal
+from app.models.project import Project
+from app.models.project_member import ProjectMember
+
+
+def test_create_project_retry_creates_one_project(client, login, monkeypatch):
+    headers = login("owner")
+    name = f"retry-{uuid.uuid4().hex[:12]}"
+    real_commit = Session.commit
+    failed = []
+
+    def commit_once_busy(self):
+        # 作成者のメンバー登録を含む commit を1回だけロック競合で失敗させる
+        if not failed and any(isinstance(obj, ProjectMember) for obj in self.new):
+            failed.append(True)
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+        return real_commit(self)
+
+    monkeypatch.setattr(Session, "commit", commit_once_busy)
+    response = client.post("/projects/", json={"name": name}, headers=headers)
+    monkeypatch.undo()
+    assert response.status_code == 200, response.text
+    assert failed
+
+    # 再実行でプロジェクトが二重に作られず、作成者は ADMIN として登録されている
+    with SessionLocal() as db:
+        projects = db.query(Project).filter(Project.name == name).all()
+        assert [project.id for project in projects] == [response.json()["id"]]
+        roles = [member.role for member in db.query(ProjectMember).filter(ProjectMember.project_id == projects[0].id)]
+        assert roles == [ROLE_ADMIN]
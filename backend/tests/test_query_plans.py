@@ -0,0 +1,17 @@
+import pytest
+
+from app.database.session import DATABASE_URL
+from scripts.check_query_plans import check, scratch_engine
+
+
+def test_hot_queries_use_indexes():
+    # DATABASE_URL によらずインメモリ SQLite でも確認する
+    with scratch_engine("sqlite://") as engine:
+        assert {name: scans for name, scans in check(engine).items() if scans} == {}
+
+
+@pytest.mark.skipif(not DATABASE_URL.startswith("postgresql"), reason="DATABASE_URL が PostgreSQL のときだけ")
+def test_hot_queries_use_indexes_on_postgresql():
+    # 作業用スキーマで実行するので、テスト用DBのテーブルには触れない
+    with scratch_engine(DATABASE_URL) as engine:
+        assert {name: issues for name, issues in check(engine).items() if issues} == {}
@@ -0,0 +1,115 @@
+def test_deadline_is_stored_as_jst(client, project):
+    project_id, headers = project
+    # UTC で送っても JST（タイムゾーンなし）にそろえて保存し、作成時のレスポンスと GET が一致する
+    response = client.post(
+        "/tasks/",
+        json={"title": "deadline", "project_id": project_id, "deadline": "2099-01-01T15:00:00Z"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    created = response.json()
+    assert created["deadline"] == "2099-01-02T00:00:00"
+    assert client.get(f"/tasks/{created['id']}", headers=headers).json() == created
+
+    response = client.patch(
+        f"/tasks/{created['id']}", json={"deadline": "2099-01-03T09:00:00+09:00"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    updated = response.json()
+    assert updated["deadline"] == "2099-01-03T09:00:00"
+    fetched = client.get(f"/tasks/{created['id']}", headers=headers)
+    assert fetched.json() == updated
+    assert fetched.headers["etag"] == response.headers["etag"]
+
+
+def test_search_snippet_escapes_task_text(client, project):
+    project_id, headers = project
+    response = client.post(
+        "/tasks/",
+        json={"title": "<img src=x onerror=alert(1)> report", "description": "a < b & report", "project_id": project_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    # スニペットの本文は HTML エスケープされ、タグは一致箇所の <mark> だけ
+    response = client.get(f"/tasks/projects/{project_id}/search", params={"q": "report"}, headers=headers)
+    assert response.status_code == 200, response.text
+    (hit,) = response.json()
+    for snippet in (hit["title_snippet"], hit["description_snippet"]):
+        assert "<mark>report</mark>" in snippet
+        assert "<" not in snippet.replace("<mark>", "").replace("</mark>", "")
+    assert "&gt; <mark>report</mark>" in hit["title_snippet"]
+    assert "&lt; b &amp; <mark>report</mark>" in hit["description_snippet"]
+
+
+def test_move_subtree_rewrites_descendant_paths(client, project, create_task):
+    _, headers = project
+
+    # 2階層以上の子孫（"/a/b/" など）も path の範囲検索で付け替わる
+    a = create_task("a")
+    b = create_task("b", a)
+    c = create_task("c", b)
+    d = create_task("d", c)
+    root = create_task("root")
+    response = client.patch(f"/tasks/{a}", json={"parent_id": root}, headers=headers)
+    assert response.status_code == 200, response.text
+    ancestors = client.get(f"/tasks/{d}/ancestors", headers=headers).json()
+    assert [task["id"] for task in ancestors] == [root, a, b, c]
+    assert [task["parent_id"] for task in ancestors] == [None, root, a, b]
+
+    # 循環チェック: 子孫の下へは移せない
+    response = client.patch(f"/tasks/{root}", json={"parent_id": d}, headers=headers)
+    assert response.status_code == 400
+
+    assert client.delete(f"/tasks/{root}", headers=headers).status_code == 204
+    assert client.get(f"/tasks/{d}", headers=headers).status_code == 404
+
+
+def test_move_subtree_logs_only_the_moved_task(client, project, create_task):
+    project_id, headers = project
+
+    a = create_task("a")
+    b = create_task("b", a)
+    create_task("c", b)
+    root = create_task("root")
+    cursor = client.get(f"/tasks/projects/{project_id}/changes", headers=headers).json()["cursor"]
+
+    # 子孫は path/depth が変わるだけなので差分同期には現れない
+    assert client.patch(f"/tasks/{a}", json={"parent_id": root}, headers=headers).status_code == 200
+    changes = client.get(f"/tasks/projects/{project_id}/changes", params={"since": cursor}, headers=headers).json()
+    assert [task["id"] for task in changes["changed"]] == [a]
+    assert changes["deleted"] == []
+
+
+def test_search_matches_inside_japanese_text(client, project, create_task):
+    project_id, headers = project
+    task_id = create_task("タスク検索機能の改善")
+
+    # 空白で区切られていない文の途中（2文字・3文字以上とも）に一致する
+    for q in ("検索", "検索機能"):
+        hits = client.get(f"/tasks/projects/{project_id}/search", params={"q": q}, headers=headers).json()
+        assert [hit["id"] for hit in hits] == [task_id], q
+        listed = client.get(f"/tasks/projects/{project_id}", params={"search": q}, headers=headers).json()
+        assert [task["id"] for task in listed] == [task_id], q
+    hits = client.get(f"/tasks/projects/{project_id}/search", params={"q": "検索機能"}, headers=headers).json()
+    assert "<mark>検索機能</mark>" in hits[0]["title_snippet"]
+
+
+def test_search_keeps_symbols_in_terms(client, project, create_task):
+    project_id, headers = project
+    ids = {title: create_task(title) for title in ("C++ build", "foo-bar cleanup", "plain")}
+
+    for q, expected in (("C++", "C++ build"), ("foo-bar", "foo-bar cleanup"), ("o-b", "foo-bar cleanup")):
+        hits = client.get(f"/tasks/projects/{project_id}/search", params={"q": q}, headers=headers).json()
+        assert [hit["id"] for hit in hits] == [ids[expected]], q
+
+
+def test_search_treats_like_wildcards_as_text(client, project, create_task):
+    project_id, headers = project
+    ids = {title: create_task(title) for title in ("100% done", "snake_case", "back\\slash", "plain")}
+
+    # % _ \ は任意の文字列・文字ではなく、その文字自体に一致する
+    for q, expected in (("%", "100% done"), ("_", "snake_case"), ("\\", "back\\slash")):
+        hits = client.get(f"/tasks/projects/{project_id}/search", params={"q": q}, headers=headers).json()
+        assert [hit["id"] for hit in hits] == [ids[expected]], q
+        listed = client.get(f"/tasks/projects/{project_id}", params={"search": q}, headers=headers).json()
+        assert [task["id"] for task in listed] == [ids[expected]], q